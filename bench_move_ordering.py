@@ -0,0 +1,126 @@
+"""
+Move ordering allocation benchmark: full sort with (score, move) tuples, as
+orderMoves does, against the preallocated MovePicker with lazy selection.
+
+On CPython the timed loop is run a second time under tracemalloc to count
+what every call allocates: the peak is reset before each call and its rise
+during the call is summed over all calls. A call's temporaries stay alive
+until it returns, so this is the allocation volume per node; memory freed
+and reused within one call (a replaced score int) only counts once. The
+change in allocated blocks over the loop shows anything kept alive.
+
+Run under both interpreters and compare:
+    python bench_move_ordering.py
+    pypy3 bench_move_ordering.py
+"""
+import gc
+import platform
+import sys
+import time
+import tracemalloc
+import chess
+from support.MovePicker import MovePicker
+
+POSITIONS = [
+    "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "r2q1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP3PPP/R2QKB1R w KQ - 0 9",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+]
+PIECE_VALUES = (0, 100, 300, 300, 500, 900, 20000)
+ITERATIONS = 2000
+
+
+def order_sorted(board, moves, take):
+    captures, ignore = [], []
+    piece_type_at = board.piece_type_at
+
+    for move in moves:
+        victim_type = piece_type_at(move.to_square)
+        if victim_type:
+            attacker_type = piece_type_at(move.from_square)
+            captures.append((10 * PIECE_VALUES[victim_type] - PIECE_VALUES[attacker_type], move))
+        else:
+            ignore.append(move)
+
+    captures.sort(key=lambda x: x[0], reverse=True)
+    ordered = [item[1] for item in captures] + ignore
+    return ordered[:take]
+
+
+def order_picker(board, moves, take, picker, ply=0):
+    picker_moves, picker_scores = picker.moves[ply], picker.scores[ply]
+    piece_type_at = board.piece_type_at
+
+    count = 0
+    for move in moves:
+        victim_type = piece_type_at(move.to_square)
+        picker_moves[count] = move
+        if victim_type:
+            picker_scores[count] = 10 * PIECE_VALUES[victim_type] - PIECE_VALUES[piece_type_at(move.from_square)]
+        else:
+            picker_scores[count] = -PIECE_VALUES[chess.KING]
+        count += 1
+
+    picked = None
+    for index in range(min(take, count)):
+        picked = picker.pick(ply, index, count)
+    return picked
+
+
+def run(name, order, boards, take):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        for board, moves in boards:
+            order(board, moves, take)
+    elapsed = time.perf_counter() - start
+
+    per_node = elapsed / (ITERATIONS * len(boards)) * 1e6
+    line = f"{name:<8} take={take:<3} {per_node:8.2f} us/node"
+
+    if platform.python_implementation() == "CPython":
+        allocated = count_allocations(order, boards, take)
+        line += f" | {allocated[0] / (ITERATIONS * len(boards)):8.1f} bytes/node allocated"
+        line += f" | {allocated[1]:+d} blocks kept"
+
+    print(line)
+
+
+def count_allocations(order, boards, take):
+    """(bytes allocated over all calls of the timed loop, net change in allocated blocks)"""
+    gc.collect()
+    gc.disable()
+    tracemalloc.start()
+    blocks = sys.getallocatedblocks()
+
+    allocated = 0
+    for _ in range(ITERATIONS):
+        for board, moves in boards:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            order(board, moves, take)
+            allocated += tracemalloc.get_traced_memory()[1] - before
+
+    blocks = sys.getallocatedblocks() - blocks
+    tracemalloc.stop()
+    gc.enable()
+    return allocated, blocks
+
+
+def main():
+    boards = []
+    for fen in POSITIONS:
+        board = chess.Board(fen)
+        boards.append((board, list(board.legal_moves)))
+
+    picker = MovePicker()
+    use_picker = lambda board, moves, take: order_picker(board, moves, take, picker)
+
+    print(f"{platform.python_implementation()} {platform.python_version()}")
+    for take in (1, 3, 256):
+        run("sorted", order_sorted, boards, take)
+        run("picker", use_picker, boards, take)
+
+
+if __name__ == "__main__":
+    main()
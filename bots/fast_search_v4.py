@@ -2,6 +2,8 @@ import random
 import chess
 import time
 from typing import List
+from support.PieceSquareTables import build_piece_square_tables, pst_index
+from support.SearchBoard import SearchBoard
 
 
 class FastBotV4:
@@ -39,9 +41,12 @@ class FastBotV4:
             (900, queen_sq_tbl),
             (20000, king_sq_tbl)
         ]
+        # Flat per-colour value + square table, see build_piece_square_tables
+        self.pst, = build_piece_square_tables(self.pieceWt)
 
         self.board = None
         self.depth = 4
+        self.use_pvs = False
 
         # Speed Testing Tools
         self.stat_tracking = False  
@@ -52,59 +57,32 @@ class FastBotV4:
 
     def delta_evaluate(self, move) -> int:
         
-        delta = 0
-
         # Local lookup improves speed
-        board, PIECE_WT = self.board, self.pieceWt
+        board, PST = self.board, self.pst
 
         source, target = move.from_square, move.to_square
-        piece = board.piece_at(source)
-
-        val, table = PIECE_WT[piece.piece_type]
-
-        if piece.color:
-            delta -= (val + table[source])
-        else:
-            delta -= -(val + table[source ^ 56])
-
-        if move.promotion:
-            p_val, p_table = PIECE_WT[move.promotion]
-            if piece.color:
-                delta += (p_val + p_table[target])
-            else:
-                delta += -(p_val + p_table[target ^ 56])
-        else:
-            if piece.color:
-                delta += (val + table[target])
-            else:
-                delta += -(val + table[target ^ 56])
+        mailbox = board.mailbox
+        piece = mailbox[source]
+        piece_type = piece & 7
+
+        # Per-colour tables already hold value + square bonus, mirrored and negated for black,
+        # and a mailbox entry (color << 3 | piece_type) shifted by 6 is the table offset
+        new_piece = (piece & 8) | move.promotion if move.promotion else piece
+        delta = PST[(new_piece << 6) | target] - PST[(piece << 6) | source]
         
         # Manage Captures
-        if board.is_capture(move):
-            if board.is_en_passant(move):
-                if board.turn == chess.WHITE:
-                    cap_sq = target - 8
-                else:
-                    cap_sq = target + 8
-                ep_piece = board.piece_at(cap_sq)
-
-                if ep_piece:
-                    c_val, c_table = PIECE_WT[ep_piece.piece_type]
-                    if ep_piece.color == chess.WHITE:
-                        delta -= (c_val + c_table[cap_sq])
-                    else:
-                        delta -= -(c_val + c_table[cap_sq ^ 56])
+        captured = mailbox[target]
+        if captured:
+            delta -= PST[(captured << 6) | target]
+        elif piece_type == chess.PAWN and target == board.ep_square:
+            if board.turn == chess.WHITE:
+                cap_sq = target - 8
             else:
-                captured_piece = board.piece_at(target)
-                if captured_piece:
-                    c_val, c_table = PIECE_WT[captured_piece.piece_type]
-                    if captured_piece.color == chess.WHITE:
-                        delta -= (c_val + c_table[target])
-                    else:
-                        delta -= -(c_val + c_table[target])
+                cap_sq = target + 8
+            delta -= PST[(mailbox[cap_sq] << 6) | cap_sq]
 
         # Manage Castling
-        if piece.piece_type == chess.KING and abs(source - target) == 2:
+        elif piece_type == chess.KING and abs(source - target) == 2:
             if move.to_square == chess.G1:
                 rook_from, rook_to = chess.H1, chess.F1
             elif move.to_square == chess.C1:
@@ -116,14 +94,8 @@ class FastBotV4:
             else:
                 return delta
 
-            r_val, r_table = PIECE_WT[chess.ROOK]
-
-            if self.board.turn == chess.WHITE:
-                delta -= (r_val + r_table[rook_from])
-                delta += (r_val + r_table[rook_to])
-            else:
-                delta -= -(r_val + r_table[rook_from ^ 56])
-                delta += -(r_val + r_table[rook_to ^ 56])
+            rook = ((piece & 8) | chess.ROOK) << 6
+            delta += PST[rook | rook_to] - PST[rook | rook_from]
 
         return delta
 
@@ -140,16 +112,12 @@ class FastBotV4:
         :rtype: int
         """
         score = 0
-        board, PIECE_WT = self.board, self.pieceWt
+        board, PST = self.board, self.pst
 
         for i in range(1, 7):
-            value, table = PIECE_WT[i]
-            
-            for square in board.pieces(i, chess.WHITE):
-                score += (value + table[square])
-            
-            for square in board.pieces(i, chess.BLACK):
-                score -= (value + table[square ^ 56])
+            for color in chess.COLORS:
+                for square in board.pieces(i, color):
+                    score += PST[pst_index(color, i, square)]
 
         return score
    
@@ -159,16 +127,16 @@ class FastBotV4:
 
         board = self.board
         PIECE_WT = self.pieceWt
-        piece_type_at = self.board.piece_type_at
+        mailbox = self.board.mailbox
         is_en_passant = self.board.is_en_passant
 
         ep_square = self.board.ep_square if self.board.ep_square else -1
 
         for move in moves:
-            victim_type = piece_type_at(move.to_square)
+            victim_type = mailbox[move.to_square] & 7
 
             if victim_type:
-                attacker_type = piece_type_at(move.from_square)
+                attacker_type = mailbox[move.from_square] & 7
                 score = (10 * PIECE_WT[victim_type][0]) - PIECE_WT[attacker_type][0]
                 captures.append((score, move))
             elif move.to_square == ep_square and is_en_passant(move):
@@ -216,11 +184,20 @@ class FastBotV4:
         pop = self.board.pop
         get_delta = self.delta_evaluate
 
+        use_pvs, first = self.use_pvs, True
+
         for move in moves:
             diff = get_delta(move)
 
             push(move)
-            score = - self.search(depth - 1, -beta, -alpha, current_eval + diff)
+            if first or not use_pvs:
+                score = - self.search(depth - 1, -beta, -alpha, current_eval + diff)
+                first = False
+            else:
+                # Principal Variation Search: prove the move is no better with a null window
+                score = - self.search(depth - 1, -alpha - 1, -alpha, current_eval + diff)
+                if alpha < score < beta:
+                    score = - self.search(depth - 1, -beta, -alpha, current_eval + diff)
             pop()
 
             if (score > max_eval):
@@ -238,7 +215,7 @@ class FastBotV4:
             self.positions_searched = 0
             self.total_moves += 1
         
-        self.board = board
+        self.board = SearchBoard.from_board(board)
         root_eval = self.init_evaluate()
 
         best_eval, best_move = float('-inf'), None
@@ -1,8 +1,9 @@
 import random
 import chess
-import chess.polyglot
 from typing import List
 import time
+from support.SearchBoard import SearchBoard
+from support.TimeManager import TimeManager, SearchTimeout
 
 
 class MidGameBotV3:
@@ -34,13 +35,21 @@ class MidGameBotV3:
 
         self.board = None
         self.depth = 6
+        self.use_delta_pruning = True
+        self.delta_margin = 200  # a capture must be able to lift stand-pat to within this of alpha
 
         self.stat_tracking = True
         self.random_opening = False
+        self.debug_hash = False
         self.total_moves = 0
         self.total_time = 0
 
+        self.positions_searched = 0
+        self.delta_pruned = 0
+        self.delta_node_prunes = 0
+
         self.transposition_table = {}
+        self.timer = TimeManager()
 
     def get_phase(self) -> float:
         board, PIECE_WT = self.board, self.pieceWt
@@ -104,6 +113,9 @@ class MidGameBotV3:
         return [item[1] for item in captures] + ignore
 
     def quiescence_search(self, alpha, beta) -> float:
+        self.positions_searched += 1
+        if not self.positions_searched & self.timer.check_mask:
+            self.timer.check()
         naive_eval = self.evaluate()
 
         if naive_eval >= beta:
@@ -111,6 +123,20 @@ class MidGameBotV3:
         if alpha < naive_eval:
             alpha = naive_eval
 
+        # Delta pruning: skip captures that can't bring stand-pat back to within
+        # delta_margin of alpha, and the whole node when not even winning a queen
+        # (plus promoting, with a pawn about to) would
+        delta_pruning = self.use_delta_pruning
+        if delta_pruning:
+            board, PIECE_WT = self.board, self.pieceWt
+            delta_base = naive_eval + self.delta_margin
+            best_gain = PIECE_WT[chess.QUEEN][0]
+            if board.pieces_mask(chess.PAWN, board.turn) & (chess.BB_RANK_7 if board.turn else chess.BB_RANK_2):
+                best_gain += PIECE_WT[chess.QUEEN][0] - PIECE_WT[chess.PAWN][0]
+            if delta_base + best_gain <= alpha:
+                self.delta_node_prunes += 1
+                return alpha
+
         captures = [
             m for m in self.board.legal_moves 
             if self.board.is_capture(m) or self.board.is_en_passant(m)
@@ -119,6 +145,14 @@ class MidGameBotV3:
         captures = self.orderMoves(captures)
 
         for move in captures:
+            if delta_pruning:
+                # no piece on the target square means en passant
+                gain = PIECE_WT[board.piece_type_at(move.to_square) or chess.PAWN][0]
+                if move.promotion:
+                    gain += PIECE_WT[move.promotion][0] - PIECE_WT[chess.PAWN][0]
+                if delta_base + gain <= alpha:
+                    self.delta_pruned += 1
+                    continue
             self.board.push(move)
             score = -self.quiescence_search(-beta, -alpha)
             self.board.pop()
@@ -131,8 +165,11 @@ class MidGameBotV3:
         return alpha
 
     def search(self, depth: int, alpha: int, beta: int) -> int:     
+        self.positions_searched += 1
+        if not self.positions_searched & self.timer.check_mask:
+            self.timer.check()
         alpha_orig = alpha
-        zobrist_key = chess.polyglot.zobrist_hash(self.board)
+        zobrist_key = self.board.key
 
         # transposition table lookup
         if zobrist_key in self.transposition_table:
@@ -186,18 +223,37 @@ class MidGameBotV3:
         
         return max_eval
 
-    def select_move(self, board: chess.Board) -> chess.Move:  
+    def select_move(self, board: chess.Board, time_limit=None, clock=None, increment=0.0) -> chess.Move:  
+        """
+        Iterative deepening up to self.depth. With time_limit (seconds for this
+        move) or clock + increment no new iteration is started after the soft
+        limit, and an iteration still running at the hard limit is abandoned
+        in favour of the last completed one.
+        """
         self.transposition_table = {}
         self.total_moves += 1 
 
         if self.random_opening and self.total_moves < 3:
             return random.choice(list(board.generate_legal_moves()))
+
+        moves = list(board.legal_moves)
+        if not moves:
+            # checkmated or stalemated, nothing to play
+            return None
+        if len(moves) == 1:
+            return moves[0]
         
         if self.stat_tracking:
             start_time = time.perf_counter()
 
-        self.board = board
-        moves = board.legal_moves
+        self.board = SearchBoard.from_board(board, debug=self.debug_hash)
+        # read now, a timed out iteration leaves the board somewhere down the tree
+        root_phase = self.get_phase()
+        self.timer.start(time_limit, clock, increment)
+        self.positions_searched = 0
+        self.delta_pruned = self.delta_node_prunes = 0
+
+        best_eval, best_move, completed_depth = float('-inf'), moves[0], 0
 
         for i in range(1, self.depth + 1):
 
@@ -206,29 +262,39 @@ class MidGameBotV3:
 
             move_scores = []
             
-            for move in moves:            
-                self.board.push(move)
-                score = - self.search(
-                    i - 1, -beta, -alpha,
-                )
-                self.board.pop()
-                
-                move_scores.append((score, move))
+            try:
+                for move in moves:            
+                    self.board.push(move)
+                    score = - self.search(
+                        i - 1, -beta, -alpha,
+                    )
+                    self.board.pop()
+                    
+                    move_scores.append((score, move))
+
+                    if (score > iter_best_eval):
+                        iter_best_eval = score
+                        iter_best_move = move
+                    
+                    alpha = max(alpha, score)
+            except SearchTimeout:
+                if not completed_depth and iter_best_move:
+                    best_eval, best_move = iter_best_eval, iter_best_move
+                break
 
-                if (score > iter_best_eval):
-                    iter_best_eval = score
-                    iter_best_move = move
-                
-                alpha = max(alpha, score)
+            best_eval, best_move, completed_depth = iter_best_eval, iter_best_move, i
                 
             # Sort moves for the NEXT iteration based on scores from THIS iteration
             move_scores.sort(key=lambda x: x[0], reverse=True)
             moves = [item[1] for item in move_scores]
 
+            if self.timer.soft_expired():
+                break
 
         if self.stat_tracking:
             end_time = time.perf_counter()
             self.total_time += end_time - start_time
-            print(f"MOVE: {iter_best_move} | EVAL: {round(iter_best_eval, 2)} | GAMESTAGE: {self.get_phase()} | TIME: {end_time - start_time}")
+            print(f"MOVE: {best_move} | EVAL: {round(best_eval, 2)} | DEPTH: {completed_depth} | GAMESTAGE: {root_phase} | TIME: {end_time - start_time}")
+            print(f"NODES: {self.positions_searched} | DELTA PRUNED: {self.delta_pruned} captures / {self.delta_node_prunes} nodes")
 
-        return iter_best_move
+        return best_move
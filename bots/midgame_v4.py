@@ -1,9 +1,32 @@
+import math
 import random
 import chess
-import chess.polyglot
-from typing import List
 import time
-from support.TranspositionTable import TranspositionTable
+from support.EvalCache import EvalCache
+from support.MovePicker import MovePicker, MAX_PLY
+from support.PieceSquareTables import build_piece_square_tables
+from support.Position import Position, NULL_MOVE, move_from_chess, move_to_chess
+from support.SearchBoard import PHASE_TAPER, MAX_PHASE
+from support.StaticExchange import static_exchange
+from support.TimeManager import TimeManager, SearchTimeout
+from support.TranspositionTable import TranspositionTable, EXACT, LOWER, UPPER
+
+MATE_SCORE = 1000000
+MATE_BOUND = 900000
+INFINITE_SCORE = 1 << 30
+INFINITE_MOVES = 1 << 30
+COUNTERMOVE_SCORE = 1 << 60
+
+
+def build_lmr_table(base=0.75, divisor=2.25, max_depth=64, max_moves=64):
+    """lmr_table[depth][moves_searched] = plies to reduce a late quiet move by"""
+    table = [[0] * max_moves for _ in range(max_depth)]
+    for depth in range(1, max_depth):
+        for moves_searched in range(1, max_moves):
+            reduction = int(base + math.log(depth) * math.log(moves_searched) / divisor)
+            # always leave at least one ply before quiescence
+            table[depth][moves_searched] = max(0, min(reduction, depth - 2))
+    return table
 
 
 class MidGameBotV4:
@@ -32,199 +55,604 @@ class MidGameBotV4:
             (900, mg_queen_table, eg_queen_table),
             (20000, mg_king_table, eg_king_table)
         ]
+        # (mg, eg) flat per-colour value + square tables the Position sums incrementally
+        self.eval_tables = build_piece_square_tables(self.pieceWt)
+        self.piece_values = tuple(weights[0] if weights else 0 for weights in self.pieceWt)
 
         self.board = None
         self.depth = 6
+        self.use_pvs = True
+        self.use_aspiration = True
+        self.aspiration_window = 35
+        self.aspiration_growth = 2
+        self.aspiration_max = 1000
+        self.use_null_move = True
+        self.null_verify_depth = 4
+        self.use_lmr = True
+        self.lmr_min_moves = 3
+        self.lmr_table = build_lmr_table()
+        self.use_lmp = True
+        self.use_pseudo_legal = True  # generate pseudo-legal moves, check legality only once a move is played
+        self.use_check_extension = True
+        self.max_check_extensions = 3  # per line from the root
+        self.use_check_evasions = True  # quiescence in check searches every evasion instead of standing pat
+        self.use_eval_cache = True  # reuse stand-pat evals of quiescence nodes by zobrist key
+        self.use_delta_pruning = True
+        self.delta_margin = 200  # a capture must be able to lift stand-pat to within this of alpha
+        self.lmp_move_counts = (INFINITE_MOVES, 8, 12, 18)  # indexed by depth, prune past this many moves
+        # Frontier pruning off the static eval at depth 1-3, never in check or with a mate score in the window
+        self.use_reverse_futility = True
+        self.reverse_futility_margin = 120  # per ply of depth left
+        self.use_futility = True
+        self.futility_margins = (0, 200, 300, 500)  # indexed by depth, quiet moves can't gain more than this
+        self.use_razoring = True
+        self.razor_margins = (0, 300, 400, 600)  # indexed by depth, this far below alpha only captures can help
+
+        # Quiet move ordering: two killer slots per ply, history[color << 12 | from << 6 | to],
+        # countermoves[(color * 7 + piece_type) << 6 | to] of the opponent's last move
+        self.root_ply = 0
+        self.killers = [[NULL_MOVE, NULL_MOVE] for _ in range(MAX_PLY)]
+        self.history = [0] * (2 * 64 * 64)
+        self.countermoves = [NULL_MOVE] * (2 * 7 * 64)
+        self.picker = MovePicker()
 
         self.stat_tracking = True
         self.random_opening = False
+        self.debug_hash = False
         self.total_moves = 0
         self.total_time = 0
-
-        self.tt = TranspositionTable(num_entries=2000000)
-
-    def get_phase(self) -> float:
-        board, PIECE_WT = self.board, self.pieceWt
-
-        materials = (
-            board.knights.bit_count() * PIECE_WT[2][0] +
-            board.bishops.bit_count() * PIECE_WT[3][0] +
-            board.rooks.bit_count() * PIECE_WT[4][0] +
-            board.queens.bit_count() * PIECE_WT[5][0]
-        )
-
-        phase = materials / 6200
-
-        return round(max(0.0, min(1.0, phase)), 2)
-
-    def evaluate(self) -> float:
-        score = 0
-        board, PIECE_WT = self.board, self.pieceWt
-        phase = self.get_phase()
-        eg_phase = 1 - phase
-
-        for i in range(1, 7):
-            value, mg_table, eg_table = PIECE_WT[i]
-            
-            for square in board.pieces(i, chess.WHITE):
-                score += (value + (phase * mg_table[square]) + (eg_phase * eg_table[square]))
-            
-            for square in board.pieces(i, chess.BLACK):
-                score -= (value + (phase * mg_table[square ^ 56]) + (eg_phase * eg_table[square ^ 56]))
-
-        if self.board.turn:
-            who2move = 1
+        self.positions_searched = 0
+        self.tt_cutoffs = 0
+        self.beta_cutoffs = 0
+        self.hash_move_cutoffs = 0
+        self.pvs_researches = 0
+        self.aspiration_fail_lows = 0
+        self.aspiration_fail_highs = 0
+        self.null_move_cutoffs = 0
+        self.lmr_reductions = 0
+        self.lmr_researches = 0
+        self.lmp_pruned = 0
+        self.delta_pruned = 0
+        self.delta_node_prunes = 0
+        self.reverse_futility_cutoffs = 0
+        self.futility_pruned = 0
+        self.razor_cutoffs = 0
+        self.check_extensions = 0
+
+        self.tt = TranspositionTable(size_mb=64)
+        self.eval_cache = EvalCache(size_mb=4)
+        self.timer = TimeManager()
+
+    def get_phase(self) -> int:
+        # 0 (endgame) to MAX_PHASE (midgame), kept up to date by the Position
+        return min(self.board.phase, MAX_PHASE)
+
+    def has_non_pawn_material(self) -> bool:
+        return self.board.has_non_pawn_material()
+
+    def evaluate(self) -> int:
+        # The Position keeps the midgame / endgame sums up to date on push and pop,
+        # so a leaf only has to blend them (integers only, midgame weight out of 256)
+        board = self.board
+        mg_weight = PHASE_TAPER[min(board.phase, MAX_PHASE)]
+        score = (board.mg_score * mg_weight + board.eg_score * (256 - mg_weight)) >> 8
+
+        if board.turn:
+            return score
+        return -score
+   
+    def pick_moves(self, tt_move, ply: int):
+        """
+        Staged move generation for the main search. Each stage is only generated
+        once the previous one is used up, so a cutoff on the hash move or a capture
+        never pays for generating and sorting the quiet moves:
+
+        1. hash move (already legality checked, no generation at all)
+        2. captures with SEE >= 0, best first
+        3. killer moves for this ply
+        4. quiet moves: countermove first, then by history score
+        5. captures that lose material
+
+        With use_pseudo_legal the moves may leave the king in check, the caller
+        has to test was_legal() after pushing them.
+        """
+        board = self.board
+        if self.use_pseudo_legal:
+            generate_captures, generate_quiets = board.generate_pseudo_captures, board.generate_pseudo_quiets
+            is_legal = board.is_pseudo_legal
         else:
-            who2move = -1
+            generate_captures, generate_quiets = board.generate_captures, board.generate_quiets
+            is_legal = board.is_legal
+
+        if tt_move:
+            yield tt_move
+
+        pick = self.picker.pick
+        picker_moves, picker_scores = self.picker.moves[ply], self.picker.scores[ply]
+        mailbox = board.mailbox
+
+        count, losing = 0, []
+        for move in generate_captures():
+            if move == tt_move:
+                continue
+            target = (move >> 6) & 63
+            exchange = static_exchange(board, move & 63, target, move >> 12)
+            if exchange >= 0:
+                picker_moves[count] = move
+                # equal exchanges: take the bigger piece first
+                picker_scores[count] = (exchange << 3) + ((mailbox[target] & 7) or chess.PAWN)
+                count += 1
+            else:
+                losing.append(move)
+
+        for index in range(count):
+            yield pick(ply, index, count)
+
+        killer_1, killer_2 = self.killers[ply]
+        is_capture = board.is_capture
+        killers = []
+        for killer in (killer_1, killer_2):
+            if killer and killer != tt_move and is_legal(killer) and not is_capture(killer):
+                killers.append(killer)
+                yield killer
+
+        # quiet moves: everything landing on an empty square, quiet promotions and castling
+        counter_index = self.countermove_index()
+        countermove = self.countermoves[counter_index] if counter_index >= 0 else NULL_MOVE
+        history, side = self.history, board.turn << 12
+
+        count = 0
+        for move in generate_quiets():
+            if move == tt_move or move in killers:
+                continue
+            picker_moves[count] = move
+            if move == countermove:
+                picker_scores[count] = COUNTERMOVE_SCORE
+            else:
+                picker_scores[count] = history[side | (move & 4095)]
+            count += 1
+
+        for index in range(count):
+            yield pick(ply, index, count)
+
+        yield from losing
+
+    def countermove_index(self) -> int:
+        """Countermove slot for the opponent's last move (its colour, piece and to-square), -1 if none."""
+        board = self.board
+        if not board.move_stack:
+            return -1
+
+        last_move = board.move_stack[-1]
+        if not last_move:
+            return -1
+
+        target = (last_move >> 6) & 63
+        return (((not board.turn) * 7 + (board.mailbox[target] & 7)) << 6) | target
+
+    def update_quiet_cutoff(self, move: int, depth: int, ply: int):
+        """Remember a quiet move that caused a beta cutoff (killer slots, countermove + history)."""
+        board = self.board
+        if move >> 12 or board.is_capture(move):
+            return
+
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+
+        counter_index = self.countermove_index()
+        if counter_index >= 0:
+            self.countermoves[counter_index] = move
+
+        self.history[(board.turn << 12) | (move & 4095)] += depth * depth
+
+    def quiescence_search(self, alpha: int, beta: int, depth=0) -> int:
+        """
+        Captures and promotions only, on top of the stand-pat eval. In check there
+        is no standing pat: every evasion is searched and having none is mate.
+
+        depth counts down from 0 so the results can share the transposition table
+        with the main search: a quiescence entry never stands in for a real search,
+        but a real search entry always answers a quiescence probe.
+        """
+        self.positions_searched += 1
+        if not self.positions_searched & self.timer.check_mask:
+            self.timer.check()
+        board = self.board
+        zobrist_key = board.key
+
+        # the picker and killers stop at MAX_PLY, a line that long settles for the static eval
+        ply = len(board.move_stack) - self.root_ply
+        if ply >= MAX_PLY - 1:
+            return self.evaluate()
 
-        return score * who2move
-   
-    def orderMoves(self, moves: List[chess.Move]) -> List[chess.Move]:
-        captures, ignore = [], []
-        board, PIECE_WT = self.board, self.pieceWt
+        entry = self.tt.probe(zobrist_key)
+        if entry:
+            tt_depth, tt_score, tt_flag, _ = entry
+            if tt_depth >= depth:
+                if (tt_flag == EXACT
+                        or (tt_flag == LOWER and tt_score >= beta)
+                        or (tt_flag == UPPER and tt_score <= alpha)):
+                    self.tt_cutoffs += 1
+                    return tt_score
 
-        piece_type_at = board.piece_type_at
-        is_en_passant = board.is_en_passant
+        alpha_orig = alpha
+        in_check = self.use_check_evasions and board.is_check()
+        delta_pruning = self.use_delta_pruning and not in_check
+
+        if not in_check:
+            if self.use_eval_cache:
+                naive_eval = self.eval_cache.probe(zobrist_key)
+                if naive_eval is None:
+                    naive_eval = self.evaluate()
+                    self.eval_cache.store(zobrist_key, naive_eval)
+            else:
+                naive_eval = self.evaluate()
 
-        ep_square = board.ep_square if board.ep_square else -1
+            if naive_eval >= beta:
+                self.tt.store(zobrist_key, depth, beta, LOWER, NULL_MOVE)
+                return beta
+            if alpha < naive_eval:
+                alpha = naive_eval
+
+        # Delta pruning: captures that can't bring stand-pat back up to alpha even
+        # with a margin for the positional swing are skipped, and the whole node
+        # when not even winning a queen (plus promoting, with a pawn about to) would
+        if delta_pruning:
+            piece_values = self.piece_values
+            delta_base = naive_eval + self.delta_margin
+            best_gain = piece_values[chess.QUEEN]
+            if board.bb[(board.turn << 3) | chess.PAWN] & (chess.BB_RANK_7 if board.turn else chess.BB_RANK_2):
+                best_gain += piece_values[chess.QUEEN] - piece_values[chess.PAWN]
+            if delta_base + best_gain <= alpha:
+                self.delta_node_prunes += 1
+                return alpha
+
+        # captures and promotions by SEE, losing ones are not worth searching here
+        # unless they are evasions
+        picker_moves, picker_scores = self.picker.moves[ply], self.picker.scores[ply]
+        mailbox = board.mailbox
+
+        pseudo_legal = self.use_pseudo_legal
+        if in_check:
+            moves = board.generate_pseudo_captures() + board.generate_pseudo_quiets() if pseudo_legal else board.generate_moves()
+        elif pseudo_legal:
+            moves = board.generate_pseudo_captures() + board.generate_pseudo_promotions()
+        else:
+            moves = board.generate_captures() + board.generate_promotions()
 
+        count = 0
         for move in moves:
-            victim_type = piece_type_at(move.to_square)
-
-            if victim_type:
-                attacker_type = piece_type_at(move.from_square)
-                score = (10 * PIECE_WT[victim_type][0]) - PIECE_WT[attacker_type][0]
-                captures.append((score, move))
-            elif move.to_square == ep_square and is_en_passant(move):
-                score = (100 * 10) - 100
-                captures.append((score, move))
-            else:
-                ignore.append(move)
-        
-        captures.sort(key=lambda x: x[0], reverse=True)
-        return [item[1] for item in captures] + ignore
+            target, promotion = (move >> 6) & 63, move >> 12
+            if in_check and not (mailbox[target] or promotion):
+                # quiet evasions go after the even captures and before the losing ones
+                picker_moves[count] = move
+                picker_scores[count] = 0
+                count += 1
+                continue
+            if delta_pruning:
+                # an empty target without a promotion is en passant
+                gain = piece_values[(mailbox[target] & 7) or (0 if promotion else chess.PAWN)]
+                if promotion:
+                    gain += piece_values[promotion] - piece_values[chess.PAWN]
+                if delta_base + gain <= alpha:
+                    self.delta_pruned += 1
+                    continue
+            exchange = static_exchange(board, move & 63, target, promotion)
+            if exchange >= 0 or in_check:
+                picker_moves[count] = move
+                picker_scores[count] = (exchange << 3) + ((mailbox[target] & 7) or chess.PAWN)
+                count += 1
+
+        best_move, moves_searched = NULL_MOVE, 0
+        for index in range(count):
+            move = self.picker.pick(ply, index, count)
+            board.push(move)
+            if pseudo_legal and not board.was_legal():
+                board.pop()
+                continue
+            score = -self.quiescence_search(-beta, -alpha, depth - 1)
+            board.pop()
+            moves_searched += 1
 
-    def quiescence_search(self, alpha, beta) -> float:
-        naive_eval = self.evaluate()
+            if score >= beta:
+                self.tt.store(zobrist_key, depth, beta, LOWER, move)
+                return beta
+            if score > alpha:
+                alpha, best_move = score, move
 
-        if naive_eval >= beta:
-            return beta
-        if alpha < naive_eval:
-            alpha = naive_eval
+        if in_check and not moves_searched:
+            return -MATE_SCORE - depth
 
-        captures = [
-            m for m in self.board.legal_moves 
-            if self.board.is_capture(m) or self.board.is_en_passant(m)
-        ]
+        self.tt.store(zobrist_key, depth, alpha, EXACT if alpha > alpha_orig else UPPER, best_move)
+        return alpha
 
-        captures = self.orderMoves(captures)
+    def search(self, depth: int, alpha: int, beta: int, allow_null=True, extensions=0) -> int:     
+        board = self.board
+        in_check = board.is_check()
 
-        for move in captures:
-            self.board.push(move)
-            score = -self.quiescence_search(-beta, -alpha)
-            self.board.pop()
+        # Check extension: a position in check is searched one ply deeper, so the
+        # evasions are never left to quiescence. extensions counts what the line
+        # has been given so far, perpetual checks can't grow it without bound.
+        if in_check and self.use_check_extension and extensions < self.max_check_extensions:
+            depth += 1
+            extensions += 1
+            self.check_extensions += 1
 
-            if score >= beta:
-                return beta
-            if score > alpha:
-                alpha = score
-                
-        return alpha
+        if depth <= 0:
+            return self.quiescence_search(alpha, beta)
 
-    def search(self, depth: int, alpha: int, beta: int) -> int:     
+        self.positions_searched += 1
+        if not self.positions_searched & self.timer.check_mask:
+            self.timer.check()
         alpha_orig = alpha
-        zobrist_key = chess.polyglot.zobrist_hash(self.board)
+        zobrist_key = board.key
 
         # transposition table lookup
+        tt_move = NULL_MOVE
         entry = self.tt.probe(zobrist_key)
         if entry:
-            # entry: key, depth, score, flag, move
-            _, tt_depth, tt_score, tt_flag, tt_move = entry
+            tt_depth, tt_score, tt_flag, tt_move = entry
             if tt_depth >= depth:
-                if tt_flag == 'EXACT':
-                    return tt_score
-                elif tt_flag == 'LOWER' and tt_score >= beta:
+                if (tt_flag == EXACT
+                        or (tt_flag == LOWER and tt_score >= beta)
+                        or (tt_flag == UPPER and tt_score <= alpha)):
+                    self.tt_cutoffs += 1
                     return tt_score
-                elif tt_flag == 'UPPER' and tt_score <= alpha:
-                    return tt_score
-
-        if depth == 0:
-            return self.quiescence_search(alpha, beta)
 
-        moves = self.orderMoves(self.board.legal_moves)
+        ply = len(board.move_stack) - self.root_ply
+        static_eval = -INFINITE_SCORE if in_check else self.evaluate()
+
+        # Frontier pruning: close to the leaves the static eval decides whether the
+        # node is worth expanding. Off in check and when either bound is a mate score.
+        futile = False
+        if depth <= 3 and not in_check and -MATE_BOUND < alpha and beta < MATE_BOUND:
+            # reverse futility: so far above beta that the opponent can't catch up in time
+            if self.use_reverse_futility and static_eval - self.reverse_futility_margin * depth >= beta:
+                self.reverse_futility_cutoffs += 1
+                return static_eval
+
+            # razoring: so far below alpha that only captures can help, ask quiescence.
+            # Null-window nodes only, on the principal variation it drops real tactics
+            if (self.use_razoring and beta - alpha == 1
+                    and static_eval + self.razor_margins[depth] <= alpha):
+                score = self.quiescence_search(alpha, beta)
+                if depth == 1 or score <= alpha:
+                    self.razor_cutoffs += 1
+                    return score
+
+            # futility: quiet moves after the first can't lift the eval up to alpha
+            futile = self.use_futility and static_eval + self.futility_margins[depth] <= alpha
+
+        # Null-move pruning: if passing still fails high the position is good enough.
+        # Not in check, not twice in a row, not without pieces (zugzwang risk) and
+        # only when the static eval already beats beta.
+        if (self.use_null_move and allow_null and depth >= 3 and beta < MATE_BOUND
+                and self.has_non_pawn_material() and not in_check
+                and static_eval >= beta):
+            reduction = 3 if depth >= 5 else 2
+
+            board.push(NULL_MOVE)
+            score = - self.search(depth - 1 - reduction, -beta, -beta + 1, False, extensions)
+            board.pop()
 
-        # check if game over
-        if not moves:
-            if self.board.is_checkmate():
-                return -1000000 - depth
-            return 0
-
-        max_eval, best_move_this_node = float("-inf"), None
-
-        for move in moves:
-            self.board.push(move)
-            score = - self.search(depth - 1, -beta, -alpha)
-            self.board.pop()
+            if score >= beta:
+                # Verify deeper cutoffs with a reduced search of our own moves
+                if depth >= self.null_verify_depth:
+                    score = self.search(depth - reduction, beta - 1, beta, False, extensions)
+
+                if score >= beta:
+                    self.null_move_cutoffs += 1
+                    return beta if score >= MATE_BOUND else score
+
+        # keys can collide, so the hash move has to be checked before it is played
+        pseudo_legal = self.use_pseudo_legal
+        if tt_move and not (board.is_pseudo_legal(tt_move) if pseudo_legal else board.is_legal(tt_move)):
+            tt_move = NULL_MOVE
+
+        use_pvs, lmr_table, lmp_limit = self.use_pvs, self.lmr_table, INFINITE_MOVES
+        is_capture, gives_check = board.is_capture, board.gives_check
+
+        # Quiet moves this late in the list get reduced (LMR) or, near the leaves, skipped (LMP),
+        # in a futile node every quiet move after the first is skipped
+        late_move, use_lmr = INFINITE_MOVES, self.use_lmr and depth >= 3 and not in_check
+        if not in_check:
+            if use_lmr:
+                late_move = self.lmr_min_moves
+            if self.use_lmp and depth < len(self.lmp_move_counts):
+                lmp_limit = self.lmp_move_counts[depth]
+                late_move = min(late_move, lmp_limit)
+            if futile:
+                late_move = 1
+
+        max_eval, best_move_this_node = -INFINITE_SCORE, NULL_MOVE
+        moves_searched = 0
+
+        for move in self.pick_moves(tt_move, ply):
+            reduction = 0
+            if (moves_searched >= late_move and not move >> 12
+                    and not is_capture(move) and not gives_check(move)):
+                if futile:
+                    self.futility_pruned += 1
+                    continue
+                if moves_searched >= lmp_limit:
+                    self.lmp_pruned += 1
+                    continue
+                if use_lmr:
+                    reduction = lmr_table[depth][min(moves_searched, 63)]
+
+            board.push(move)
+            if pseudo_legal and not board.was_legal():
+                board.pop()
+                continue
+
+            score = None
+            if reduction:
+                self.lmr_reductions += 1
+                score = - self.search(depth - 1 - reduction, -alpha - 1, -alpha, True, extensions)
+                if score > alpha:
+                    self.lmr_researches += 1
+                    score = None
+
+            if score is None:
+                if not moves_searched or not use_pvs:
+                    score = - self.search(depth - 1, -beta, -alpha, True, extensions)
+                else:
+                    # Principal Variation Search: prove the move is no better with a null window
+                    score = - self.search(depth - 1, -alpha - 1, -alpha, True, extensions)
+                    if alpha < score < beta:
+                        self.pvs_researches += 1
+                        score = - self.search(depth - 1, -beta, -alpha, True, extensions)
+            board.pop()
+            moves_searched += 1
 
             if (score > max_eval):
                 max_eval, best_move_this_node = score, move
 
             alpha = max(alpha, score)
             if alpha >= beta:
+                self.beta_cutoffs += 1
+                if move == tt_move:
+                    self.hash_move_cutoffs += 1
+                self.update_quiet_cutoff(move, depth, ply)
                 break
 
-        # 0 = Exact, 1 = Lower, 2 = Upper
-        flag = 0
+        # check if game over
+        if not best_move_this_node:
+            if in_check:
+                return -MATE_SCORE - depth
+            return 0
+
+        flag = EXACT
         if max_eval <= alpha_orig:
-            flag = 2
+            flag = UPPER
         elif max_eval >= beta:
-            flag = 1
+            flag = LOWER
         
         self.tt.store(zobrist_key, depth, max_eval, flag, best_move_this_node)
         return max_eval
 
-    def select_move(self, board: chess.Board) -> chess.Move:  
+    def search_root(self, depth: int, alpha: int, beta: int, moves, move_scores) -> int:
+        """
+        Searches the root moves in order, appending (score, move) to move_scores
+        as they finish. Stops early on a fail high.
+        """
+        board = self.board
+        best_eval = -INFINITE_SCORE
+
+        for move in moves:
+            board.push(move)
+            score = - self.search(depth - 1, -beta, -alpha)
+            board.pop()
+
+            move_scores.append((score, move))
+
+            if (score > best_eval):
+                best_eval = score
+
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        return best_eval
+
+    def select_move(self, board: chess.Board, time_limit=None, clock=None, increment=0.0) -> chess.Move:  
+        """
+        Iterative deepening up to self.depth. With time_limit (seconds for this
+        move) or clock + increment no new iteration is started after the soft
+        limit, and an iteration still running at the hard limit is abandoned
+        in favour of the last completed one.
+        """
         self.total_moves += 1 
 
         if self.random_opening and self.total_moves < 3:
             return random.choice(list(board.generate_legal_moves()))
+
+        moves = list(board.legal_moves)
+        if not moves:
+            # checkmated or stalemated, nothing to play
+            return None
+        if len(moves) == 1:
+            return moves[0]
         
         if self.stat_tracking:
             start_time = time.perf_counter()
 
-        self.board = board
-        moves = board.legal_moves
+        self.board = Position.from_board(board, eval_tables=self.eval_tables, debug=self.debug_hash)
+        # read now, a timed out iteration leaves the board somewhere down the tree
+        root_phase = self.get_phase()
+        moves = [move_from_chess(move) for move in moves]
+        self.tt.new_search()
+        self.root_ply = len(self.board.move_stack)
+        self.killers = [[NULL_MOVE, NULL_MOVE] for _ in range(MAX_PLY)]
+        self.history = [value >> 1 for value in self.history]
+        self.timer.start(time_limit, clock, increment)
+        self.positions_searched = self.tt_cutoffs = 0
+        self.eval_cache.hits = 0
+        self.beta_cutoffs = self.hash_move_cutoffs = self.pvs_researches = 0
+        self.aspiration_fail_lows = self.aspiration_fail_highs = 0
+        self.null_move_cutoffs = self.lmr_reductions = self.lmr_researches = self.lmp_pruned = 0
+        self.delta_pruned = self.delta_node_prunes = 0
+        self.reverse_futility_cutoffs = self.futility_pruned = self.razor_cutoffs = 0
+        self.check_extensions = 0
+
+        best_eval, best_move, completed_depth = -INFINITE_SCORE, moves[0], 0
 
         for i in range(1, self.depth + 1):
 
-            iter_best_eval, iter_best_move = float('-inf'), None
-            alpha, beta = float('-inf'), float('inf')
-
-            move_scores = []
-            
-            for move in moves:            
-                self.board.push(move)
-                score = - self.search(
-                    i - 1, -beta, -alpha,
-                )
-                self.board.pop()
-                
-                move_scores.append((score, move))
-
-                if (score > iter_best_eval):
-                    iter_best_eval = score
-                    iter_best_move = move
-                
-                alpha = max(alpha, score)
-                
+            # Aspiration window around the previous iteration's score
+            delta = self.aspiration_window
+            if self.use_aspiration and completed_depth and abs(best_eval) < MATE_BOUND:
+                alpha, beta = best_eval - delta, best_eval + delta
+            else:
+                alpha, beta = -INFINITE_SCORE, INFINITE_SCORE
+
+            try:
+                while True:
+                    move_scores = []
+                    iter_best_eval = self.search_root(i, alpha, beta, moves, move_scores)
+
+                    if alpha < iter_best_eval < beta:
+                        break
+
+                    if delta > self.aspiration_max:
+                        alpha, beta = -INFINITE_SCORE, INFINITE_SCORE
+                    elif iter_best_eval <= alpha:
+                        self.aspiration_fail_lows += 1
+                        alpha = iter_best_eval - delta
+                    elif iter_best_eval >= beta:
+                        self.aspiration_fail_highs += 1
+                        beta = iter_best_eval + delta
+
+                        # Search the move that failed high first next time
+                        fail_high_move = move_scores[-1][1]
+                        moves.remove(fail_high_move)
+                        moves.insert(0, fail_high_move)
+
+                    delta *= self.aspiration_growth
+            except SearchTimeout:
+                if not completed_depth and move_scores:
+                    best_eval, best_move = max(move_scores, key=lambda x: x[0])
+                break
+
             # Sort moves for the NEXT iteration based on scores from THIS iteration
             move_scores.sort(key=lambda x: x[0], reverse=True)
             moves = [item[1] for item in move_scores]
 
+            best_eval, best_move, completed_depth = iter_best_eval, moves[0], i
+
+            if self.timer.soft_expired():
+                break
+
+        best_move = move_to_chess(best_move)
 
         if self.stat_tracking:
             end_time = time.perf_counter()
             self.total_time += end_time - start_time
-            print(f"MOVE: {iter_best_move} | EVAL: {round(iter_best_eval, 2)} | GAMESTAGE: {self.get_phase()} | TIME: {end_time - start_time}")
+            print(f"MOVE: {best_move} | EVAL: {best_eval} | DEPTH: {completed_depth} | GAMESTAGE: {root_phase} | HASHFULL: {self.tt.hashfull()} | TIME: {end_time - start_time}")
+            print(f"NODES: {self.positions_searched} | TT CUTOFFS: {self.tt_cutoffs} | HASH MOVE CUTOFFS: {self.hash_move_cutoffs}/{self.beta_cutoffs} | PVS RE-SEARCHES: {self.pvs_researches} | ASPIRATION FAILS: {self.aspiration_fail_lows} low / {self.aspiration_fail_highs} high | NULL MOVE CUTOFFS: {self.null_move_cutoffs} | EVAL CACHE HITS: {self.eval_cache.hits}")
+            print(f"LMR: {self.lmr_reductions} reduced / {self.lmr_researches} re-searched | LMP PRUNED: {self.lmp_pruned} | DELTA PRUNED: {self.delta_pruned} captures / {self.delta_node_prunes} nodes")
+            print(f"REVERSE FUTILITY CUTOFFS: {self.reverse_futility_cutoffs} | FUTILITY PRUNED: {self.futility_pruned} | RAZOR CUTOFFS: {self.razor_cutoffs} | CHECK EXTENSIONS: {self.check_extensions}")
 
-        return iter_best_move
+        return best_move
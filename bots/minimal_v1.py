@@ -2,6 +2,14 @@ import random
 import chess
 from typing import List
 import time
+from support.EvalCache import EvalCache
+from support.PieceSquareTables import build_piece_square_tables
+from support.SearchBoard import SearchBoard, PHASE_TAPER, MAX_PHASE
+from support.StaticExchange import see
+
+MATE_SCORE = 1000000
+MATE_BOUND = 900000
+INFINITE_SCORE = 1 << 30
 
 
 class MiniBotV1:
@@ -30,90 +38,129 @@ class MiniBotV1:
             (900, mg_queen_table, eg_queen_table),
             (20000, mg_king_table, eg_king_table)
         ]
+        # (mg, eg) flat per-colour value + square tables the SearchBoard sums incrementally
+        self.eval_tables = build_piece_square_tables(self.pieceWt)
 
         self.board = None
         self.depth = 6
+        self.use_pvs = False
+        self.use_check_extension = True
+        self.max_check_extensions = 3  # per line from the root
+        self.use_check_evasions = True  # quiescence in check searches every evasion instead of standing pat
+        # Frontier pruning off the static eval at depth 1-3, never in check or with a mate score in the window
+        self.use_reverse_futility = True
+        self.reverse_futility_margin = 120  # per ply of depth left
+        self.use_futility = True
+        self.futility_margins = (0, 200, 300, 500)  # indexed by depth, quiet moves can't gain more than this
+        self.use_razoring = True  # only takes effect with use_pvs: razoring needs null-window nodes
+        self.razor_margins = (0, 300, 400, 600)  # indexed by depth, this far below alpha only captures can help
+        self.use_eval_cache = True  # reuse stand-pat evals of quiescence nodes by zobrist key
+        self.eval_cache = EvalCache(size_mb=4)
+
+        # countermoves[(color * 7 + piece_type) << 6 | to] of the opponent's last move
+        self.countermoves = [None] * (2 * 7 * 64)
 
         self.stat_tracking = True
         self.random_opening = False
         self.total_moves = 0
         self.total_time = 0
-
-    def get_phase(self) -> float:
-        board, PIECE_WT = self.board, self.pieceWt
-
-        materials = (
-            board.knights.bit_count() * PIECE_WT[2][0] +
-            board.bishops.bit_count() * PIECE_WT[3][0] +
-            board.rooks.bit_count() * PIECE_WT[4][0] +
-            board.queens.bit_count() * PIECE_WT[5][0]
-        )
-
-        phase = materials / 6200
-
-        return round(max(0.0, min(1.0, phase)), 2)
-
-    def evaluate(self) -> float:
-        score = 0
-        board, PIECE_WT = self.board, self.pieceWt
-        phase = self.get_phase()
-        eg_phase = 1 - phase
-
-        for i in range(1, 7):
-            value, mg_table, eg_table = PIECE_WT[i]
-            
-            for square in board.pieces(i, chess.WHITE):
-                score += (value + (phase * mg_table[square]) + (eg_phase * eg_table[square]))
-            
-            for square in board.pieces(i, chess.BLACK):
-                score -= (value + (phase * mg_table[square ^ 56]) + (eg_phase * eg_table[square ^ 56]))
-
-        if self.board.turn:
-            who2move = 1
-        else:
-            who2move = -1
-
-        return score * who2move
+        self.positions_searched = 0
+
+    def get_phase(self) -> int:
+        # 0 (endgame) to MAX_PHASE (midgame), kept up to date by the SearchBoard
+        return min(self.board.phase, MAX_PHASE)
+
+    def evaluate(self) -> int:
+        # The SearchBoard keeps the midgame / endgame sums up to date on push and pop,
+        # so a leaf only has to blend them (integers only, midgame weight out of 256)
+        board = self.board
+        mg_weight = PHASE_TAPER[min(board.phase, MAX_PHASE)]
+        score = (board.mg_score * mg_weight + board.eg_score * (256 - mg_weight)) >> 8
+
+        if board.turn:
+            return score
+        return -score
    
-    def orderMoves(self, moves: List[chess.Move]) -> List[chess.Move]:
-        captures, ignore = [], []
-        board, PIECE_WT = self.board, self.pieceWt
-
-        piece_type_at = board.piece_type_at
+    def orderMoves(self, moves: List[chess.Move], drop_losing_captures=False) -> List[chess.Move]:
+        """
+        Captures by static exchange value, then quiet moves, then captures that
+        lose material (SEE < 0), which are left out entirely when drop_losing_captures.
+        """
+        captures, ignore, losing = [], [], []
+        board = self.board
+
+        mailbox = board.mailbox
         is_en_passant = board.is_en_passant
 
         ep_square = board.ep_square if board.ep_square else -1
 
         for move in moves:
-            victim_type = piece_type_at(move.to_square)
-
-            if victim_type:
-                attacker_type = piece_type_at(move.from_square)
-                score = (10 * PIECE_WT[victim_type][0]) - PIECE_WT[attacker_type][0]
-                captures.append((score, move))
-            elif move.to_square == ep_square and is_en_passant(move):
-                score = (100 * 10) - 100
-                captures.append((score, move))
+            victim_type = mailbox[move.to_square] & 7
+
+            if victim_type or (move.to_square == ep_square and is_en_passant(move)):
+                exchange = see(board, move)
+                if exchange >= 0:
+                    # equal exchanges: take the bigger piece first
+                    captures.append(((exchange << 3) + (victim_type or chess.PAWN), move))
+                elif not drop_losing_captures:
+                    losing.append(move)
             else:
                 ignore.append(move)
         
         captures.sort(key=lambda x: x[0], reverse=True)
-        return [item[1] for item in captures] + ignore
 
-    def quiescence_search(self, alpha, beta) -> float:
-        naive_eval = self.evaluate()
+        # The quiet move that last refuted the opponent's previous move goes first
+        if ignore:
+            counter_index = self.countermove_index()
+            if counter_index >= 0:
+                countermove = self.countermoves[counter_index]
+                if countermove in ignore:
+                    ignore.remove(countermove)
+                    ignore.insert(0, countermove)
+
+        return [item[1] for item in captures] + ignore + losing
+
+    def countermove_index(self) -> int:
+        """Countermove slot for the opponent's last move (its colour, piece and to-square), -1 if none."""
+        board = self.board
+        if not board.move_stack:
+            return -1
+
+        last_move = board.move_stack[-1]
+        if not last_move:
+            return -1
+
+        return (((not board.turn) * 7 + (board.mailbox[last_move.to_square] & 7)) << 6) | last_move.to_square
+
+    def quiescence_search(self, alpha: int, beta: int) -> int:
+        self.positions_searched += 1
+        board = self.board
+
+        # In check there is no standing pat: every evasion is searched and having none is mate
+        if self.use_check_evasions and board.is_check():
+            captures = self.orderMoves(board.legal_moves)
+            if not captures:
+                return -MATE_SCORE
+        else:
+            if self.use_eval_cache:
+                naive_eval = self.eval_cache.probe(board.key)
+                if naive_eval is None:
+                    naive_eval = self.evaluate()
+                    self.eval_cache.store(board.key, naive_eval)
+            else:
+                naive_eval = self.evaluate()
 
-        if naive_eval >= beta:
-            return beta
-        if alpha < naive_eval:
-            alpha = naive_eval
+            if naive_eval >= beta:
+                return beta
+            if alpha < naive_eval:
+                alpha = naive_eval
 
-        captures = [
-            m for m in self.board.legal_moves 
-            if self.board.is_capture(m) or self.board.is_en_passant(m)
-        ]
+            # captures (en passant included) and quiet promotions, straight from the generator
+            own_pawns = board.pawns & board.occupied_co[board.turn]
+            captures = list(board.generate_legal_captures())
+            captures.extend(board.generate_legal_moves(own_pawns, chess.BB_BACKRANKS & ~board.occupied))
 
-        captures = self.orderMoves(captures)
+            captures = self.orderMoves(captures, drop_losing_captures=True)
 
         for move in captures:
             self.board.push(move)
@@ -127,23 +174,65 @@ class MiniBotV1:
                 
         return alpha
 
-    def search(self, depth: int, alpha: int, beta: int) -> int:     
+    def search(self, depth: int, alpha: int, beta: int, extensions=0) -> int:     
+        self.positions_searched += 1
+        in_check = self.board.is_check()
+
+        # Check extension: one more ply while in check, at most max_check_extensions per line
+        if in_check and self.use_check_extension and extensions < self.max_check_extensions:
+            depth += 1
+            extensions += 1
+
         if depth == 0:
             return self.quiescence_search(alpha, beta)
 
+        # Frontier pruning: close to the leaves the static eval decides whether the
+        # node is worth expanding. Off in check and when either bound is a mate score.
+        futile = False
+        if depth <= 3 and -MATE_BOUND < alpha and beta < MATE_BOUND and not in_check:
+            static_eval = self.evaluate()
+
+            # reverse futility: so far above beta that the opponent can't catch up in time
+            if self.use_reverse_futility and static_eval - self.reverse_futility_margin * depth >= beta:
+                return static_eval
+
+            # razoring: so far below alpha that only captures can help, ask quiescence.
+            # Null-window nodes only, on the principal variation it drops real tactics,
+            # so without PVS (no null windows at all) there is nothing to razor
+            if (self.use_razoring and self.use_pvs and beta - alpha == 1
+                    and static_eval + self.razor_margins[depth] <= alpha):
+                score = self.quiescence_search(alpha, beta)
+                if depth == 1 or score <= alpha:
+                    return score
+
+            # futility: quiet moves after the first can't lift the eval up to alpha
+            futile = self.use_futility and static_eval + self.futility_margins[depth] <= alpha
+
         moves = self.orderMoves(self.board.legal_moves)
 
         # check if game over
         if not moves:
-            if self.board.is_checkmate():
-                return -1000000 - depth
+            if in_check:
+                return -MATE_SCORE - depth
             return 0
 
-        max_eval = float("-inf")
+        max_eval = -INFINITE_SCORE
+        use_pvs, first = self.use_pvs, True
 
         for move in moves:
+            if (futile and not first and not move.promotion
+                    and not self.board.is_capture(move) and not self.board.gives_check(move)):
+                continue
+
             self.board.push(move)
-            score = - self.search(depth - 1, -beta, -alpha)
+            if first or not use_pvs:
+                score = - self.search(depth - 1, -beta, -alpha, extensions)
+                first = False
+            else:
+                # Principal Variation Search: prove the move is no better with a null window
+                score = - self.search(depth - 1, -alpha - 1, -alpha, extensions)
+                if alpha < score < beta:
+                    score = - self.search(depth - 1, -beta, -alpha, extensions)
             self.board.pop()
 
             if (score > max_eval):
@@ -151,6 +240,10 @@ class MiniBotV1:
 
             alpha = max(alpha, score)
             if alpha >= beta:
+                if not move.promotion and not self.board.is_capture(move):
+                    counter_index = self.countermove_index()
+                    if counter_index >= 0:
+                        self.countermoves[counter_index] = move
                 break
         
         return max_eval
@@ -164,10 +257,11 @@ class MiniBotV1:
         if self.stat_tracking:
             start_time = time.perf_counter()
 
-        self.board = board
+        self.board = SearchBoard.from_board(board, eval_tables=self.eval_tables)
+        self.positions_searched = 0
 
-        best_eval, best_move = float('-inf'), None
-        alpha, beta = float('-inf'), float('inf')
+        best_eval, best_move = -INFINITE_SCORE, None
+        alpha, beta = -INFINITE_SCORE, INFINITE_SCORE
 
         moves = self.orderMoves(self.board.legal_moves)
             
@@ -187,6 +281,6 @@ class MiniBotV1:
         if self.stat_tracking:
             end_time = time.perf_counter()
             self.total_time += end_time - start_time
-            print(f"MOVE: {best_move} | EVAL: {round(best_eval, 2)} | GAMESTAGE: {self.get_phase()} | TIME: {end_time - start_time}")
+            print(f"MOVE: {best_move} | EVAL: {best_eval} | GAMESTAGE: {self.get_phase()} | NODES: {self.positions_searched} | TIME: {end_time - start_time}")
 
         return best_move
@@ -0,0 +1,89 @@
+"""
+Perft check for support/Position against python-chess.
+
+Counts leaf nodes of the legal move tree on the standard perft positions and
+compares them with python-chess (and the published counts). On a mismatch
+the root moves are divided so the bad subtree can be followed down.
+
+    python perft.py            depth 3, debug checks on
+    python perft.py 4          deeper, no debug checks (python-chess takes minutes here)
+"""
+import sys
+import time
+import chess
+from support.Position import Position, move_to_chess
+
+# (fen, node counts from depth 1 up)
+POSITIONS = [
+    (chess.STARTING_FEN, [20, 400, 8902, 197281]),
+    ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", [48, 2039, 97862, 4085603]),
+    ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812, 43238]),
+    ("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", [6, 264, 9467, 422333]),
+    ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", [44, 1486, 62379, 2103487]),
+    ("r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10", [46, 2079, 89890, 3894594]),
+]
+
+
+def chess_perft(board: chess.Board, depth: int) -> int:
+    if depth == 1:
+        return board.legal_moves.count()
+    nodes = 0
+    for move in board.legal_moves:
+        board.push(move)
+        nodes += chess_perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+
+def divide(board: chess.Board, position: Position, depth: int):
+    """Prints the root moves whose subtree counts differ"""
+    expected = {move: chess_perft_after(board, move, depth - 1) for move in board.legal_moves}
+    found = {}
+    for move in position.generate_moves():
+        position.push(move)
+        found[move_to_chess(move)] = position.perft(depth - 1)
+        position.pop()
+
+    for move in sorted(set(expected) | set(found), key=str):
+        if expected.get(move) != found.get(move):
+            print(f"    {move}: python-chess {expected.get(move)} position {found.get(move)}")
+
+
+def chess_perft_after(board: chess.Board, move: chess.Move, depth: int) -> int:
+    board.push(move)
+    nodes = chess_perft(board, depth) if depth else 1
+    board.pop()
+    return nodes
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    failures = 0
+
+    for fen, counts in POSITIONS:
+        board = chess.Board(fen)
+        position = Position.from_board(board, debug=depth <= 3)
+
+        start = time.perf_counter()
+        nodes = position.perft(depth)
+        elapsed = time.perf_counter() - start
+
+        # python-chess is the reference, the published counts double check it where known
+        expected = chess_perft(board, depth)
+        if depth <= len(counts) and counts[depth - 1] != expected:
+            print(f"python-chess gives {expected}, published count is {counts[depth - 1]}")
+            expected = counts[depth - 1]
+        status = "ok" if nodes == expected else "MISMATCH"
+        print(f"{status:<8} depth {depth} {nodes:>9} nodes {elapsed:7.2f}s {nodes / max(elapsed, 1e-9):10.0f} nps  {fen}")
+
+        if nodes != expected:
+            failures += 1
+            divide(board, position, depth)
+
+        assert position.fen() == board.fen(), "push/pop did not restore the position"
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
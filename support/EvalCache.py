@@ -0,0 +1,42 @@
+from array import array
+
+ENTRY_BYTES = 16  # 8 byte key + 8 byte score
+
+
+class EvalCache:
+    """
+    Direct mapped cache of static evaluations by zobrist key, for the
+    stand-pat score of quiescence nodes. Like the TranspositionTable it lives
+    in two flat arrays sized up front, a colliding key just overwrites the
+    slot. Scores are from the side to move's point of view, which the key
+    already covers.
+    """
+
+    def __init__(self, size_mb=4):
+        num_entries = 1
+        while num_entries * 2 * ENTRY_BYTES <= size_mb * 1024 * 1024:
+            num_entries *= 2
+
+        self.size = num_entries
+        self.mask = num_entries - 1
+        self.keys = array('Q', [0]) * num_entries
+        self.scores = array('q', [0]) * num_entries
+        self.hits = 0
+
+    def clear(self):
+        self.keys = array('Q', [0]) * self.size
+        self.scores = array('q', [0]) * self.size
+        self.hits = 0
+
+    def probe(self, key):
+        """Cached score for key, None on a miss."""
+        index = key & self.mask
+        if self.keys[index] != key:
+            return None
+        self.hits += 1
+        return self.scores[index]
+
+    def store(self, key, score):
+        index = key & self.mask
+        self.keys[index] = key
+        self.scores[index] = score
@@ -0,0 +1,33 @@
+MAX_PLY = 128
+MAX_MOVES = 256
+
+
+class MovePicker:
+    """
+    Preallocated per-ply move and score buffers with lazy selection.
+
+    The search writes the moves of a node and their integer scores into
+    moves[ply] / scores[ply], then asks for them back one at a time with
+    pick(). Each pick is one pass of selection sort over what is left, so a
+    node that cuts off after two moves never pays for sorting the rest, and
+    no (score, move) tuples or sorted copies are allocated per node.
+    """
+
+    def __init__(self, max_ply=MAX_PLY, max_moves=MAX_MOVES):
+        self.moves = [[0] * max_moves for _ in range(max_ply)]
+        self.scores = [[0] * max_moves for _ in range(max_ply)]
+
+    def pick(self, ply: int, start: int, count: int):
+        """Swaps the best scored move in [start, count) into start and returns it."""
+        moves, scores = self.moves[ply], self.scores[ply]
+
+        best, best_score = start, scores[start]
+        for index in range(start + 1, count):
+            if scores[index] > best_score:
+                best, best_score = index, scores[index]
+
+        if best != start:
+            moves[start], moves[best] = moves[best], moves[start]
+            scores[start], scores[best] = best_score, scores[start]
+
+        return moves[start]
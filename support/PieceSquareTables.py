@@ -0,0 +1,32 @@
+import chess
+
+
+def pst_index(color: chess.Color, piece_type: chess.PieceType, square: chess.Square) -> int:
+    """Index into a table from build_piece_square_tables: color << 9 | piece_type << 6 | square"""
+    return (color << 9) | (piece_type << 6) | square
+
+
+def build_piece_square_tables(piece_wt) -> tuple:
+    """
+    Flattens the bots' pieceWt ([None, (value, table, ...), ...] by piece type,
+    tables from white's side) into one flat list per table, indexed by
+    pst_index(color, piece_type, square).
+
+    Each entry already holds value + table bonus, mirrored for black and
+    negated for black, so evaluation is a plain sum with white positive and
+    no square flipping or colour branches at runtime.
+
+    (value, mg_table, eg_table) entries give (mg, eg), (value, table) gives (table,).
+    """
+    table_count = len(piece_wt[chess.PAWN]) - 1
+    tables = tuple([0] * (2 << 9) for _ in range(table_count))
+
+    for piece_type in range(chess.PAWN, chess.KING + 1):
+        value, *piece_tables = piece_wt[piece_type]
+
+        for flat, table in zip(tables, piece_tables):
+            for square in range(64):
+                flat[pst_index(chess.WHITE, piece_type, square)] = value + table[square]
+                flat[pst_index(chess.BLACK, piece_type, square)] = -(value + table[square ^ 56])
+
+    return tables
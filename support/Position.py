@@ -0,0 +1,653 @@
+import chess
+import chess.polyglot
+from support.SearchBoard import PIECE_KEYS, EP_KEYS, TURN_KEY, CASTLING_ROOKS, PHASE_WEIGHTS
+
+# Moves are plain ints: from | to << 6 | promotion << 12, 0 is the null move
+NULL_MOVE = 0
+
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+
+POLYGLOT = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+
+# CASTLING_KEYS[rights], polyglot hashes the four rights at 768 + bit
+CASTLING_KEYS = [0] * 16
+for _rights in range(16):
+    for _bit in range(4):
+        if _rights & (1 << _bit):
+            CASTLING_KEYS[_rights] ^= POLYGLOT[768 + _bit]
+
+# rights &= CASTLING_KEEP[from] & CASTLING_KEEP[to] after every move
+CASTLING_KEEP = [15] * 64
+CASTLING_KEEP[chess.E1] = 15 & ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_KEEP[chess.H1] = 15 & ~WHITE_KINGSIDE
+CASTLING_KEEP[chess.A1] = 15 & ~WHITE_QUEENSIDE
+CASTLING_KEEP[chess.E8] = 15 & ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_KEEP[chess.H8] = 15 & ~BLACK_KINGSIDE
+CASTLING_KEEP[chess.A8] = 15 & ~BLACK_QUEENSIDE
+
+# (right, king from, king to, squares that must be empty, squares the king crosses)
+CASTLING_MOVES = (
+    (WHITE_KINGSIDE, chess.E1, chess.G1, chess.BB_F1 | chess.BB_G1, (chess.E1, chess.F1, chess.G1)),
+    (WHITE_QUEENSIDE, chess.E1, chess.C1, chess.BB_B1 | chess.BB_C1 | chess.BB_D1, (chess.E1, chess.D1, chess.C1)),
+    (BLACK_KINGSIDE, chess.E8, chess.G8, chess.BB_F8 | chess.BB_G8, (chess.E8, chess.F8, chess.G8)),
+    (BLACK_QUEENSIDE, chess.E8, chess.C8, chess.BB_B8 | chess.BB_C8 | chess.BB_D8, (chess.E8, chess.D8, chess.C8)),
+)
+CASTLING_BY_TARGET = {castle[2]: castle for castle in CASTLING_MOVES}
+
+# Attack tables. Leapers are indexed by square, sliders by square and the
+# occupancy of their rank / file / diagonals (python-chess precomputes every subset).
+BB_SQUARES = chess.BB_SQUARES
+KNIGHT_ATTACKS = chess.BB_KNIGHT_ATTACKS
+KING_ATTACKS = chess.BB_KING_ATTACKS
+PAWN_ATTACKS = chess.BB_PAWN_ATTACKS
+RANK_MASKS, RANK_ATTACKS = chess.BB_RANK_MASKS, chess.BB_RANK_ATTACKS
+FILE_MASKS, FILE_ATTACKS = chess.BB_FILE_MASKS, chess.BB_FILE_ATTACKS
+DIAG_MASKS, DIAG_ATTACKS = chess.BB_DIAG_MASKS, chess.BB_DIAG_ATTACKS
+RAYS = chess.BB_RAYS
+BETWEEN = [[chess.between(a, b) for b in range(64)] for a in range(64)]
+
+PROMOTION_RANKS = (chess.BB_RANK_1, chess.BB_RANK_8)
+DOUBLE_PUSH_RANKS = (chess.BB_RANK_6, chess.BB_RANK_3)
+PROMOTIONS = (chess.QUEEN, chess.KNIGHT, chess.ROOK, chess.BISHOP)
+
+
+def move_from_chess(move: chess.Move) -> int:
+    if not move:
+        return NULL_MOVE
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def move_to_chess(move: int) -> chess.Move:
+    if not move:
+        return chess.Move.null()
+    return chess.Move(move & 63, (move >> 6) & 63, (move >> 12) or None)
+
+
+class Position:
+    """
+    Search-only board: one bitboard per piece (bb[color << 3 | piece_type]),
+    a mailbox of the same codes, and push/pop that keep the polyglot key and
+    the tapered eval sums (see SearchBoard) up to date with one undo tuple per
+    move, instead of chess.Board's full state snapshot.
+
+    Moves are ints (from | to << 6 | promotion << 12). Convert with from_board()
+    / to_board() and move_from_chess() / move_to_chess() at the bot's
+    select_move boundary. Standard chess only, no chess960. pop only undoes
+    moves pushed on this Position.
+
+    With debug=True every push checks the key, mailbox and eval sums against a
+    fresh recomputation.
+    """
+
+    def __init__(self, eval_tables=None, debug=False):
+        self.bb = [0] * 16
+        self.occupied_co = [0, 0]
+        self.occupied = 0
+        self.mailbox = [0] * 64
+
+        self.turn = chess.WHITE
+        self.castling = 0
+        self.ep_square = None
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+
+        self.eval_tables = eval_tables
+        self.debug = debug
+        self.key = 0
+        self.mg_score = self.eg_score = self.phase = 0
+
+        self.move_stack = []
+        self._undo = []
+
+    @classmethod
+    def from_board(cls, board: chess.Board, eval_tables=None, debug=False) -> "Position":
+        if board.chess960:
+            raise ValueError("Position only supports standard chess")
+
+        position = cls(eval_tables, debug)
+        for square, piece in board.piece_map().items():
+            code = (piece.color << 3) | piece.piece_type
+            position.bb[code] |= BB_SQUARES[square]
+            position.mailbox[square] = code
+        position.occupied_co = [board.occupied_co[chess.BLACK], board.occupied_co[chess.WHITE]]
+        position.occupied = board.occupied
+
+        rights = board.clean_castling_rights()
+        for right, rook in ((WHITE_KINGSIDE, chess.BB_H1), (WHITE_QUEENSIDE, chess.BB_A1),
+                            (BLACK_KINGSIDE, chess.BB_H8), (BLACK_QUEENSIDE, chess.BB_A8)):
+            if rights & rook:
+                position.castling |= right
+
+        position.turn = board.turn
+        position.halfmove_clock = board.halfmove_clock
+        position.fullmove_number = board.fullmove_number
+        if board.ep_square is not None and position.can_capture_en_passant(board.ep_square):
+            position.ep_square = board.ep_square
+
+        # the opponent's last move, for countermove lookups at the root
+        position.move_stack = [move_from_chess(move) for move in board.move_stack[-1:]]
+
+        position.key = position.compute_key()
+        position.mg_score, position.eg_score, position.phase = position.compute_eval()
+        return position
+
+    def to_board(self) -> chess.Board:
+        board = chess.Board(None)
+        for square, code in enumerate(self.mailbox):
+            if code:
+                board.set_piece_at(square, chess.Piece(code & 7, bool(code >> 3)))
+
+        board.turn = self.turn
+        for right, rook in ((WHITE_KINGSIDE, chess.BB_H1), (WHITE_QUEENSIDE, chess.BB_A1),
+                            (BLACK_KINGSIDE, chess.BB_H8), (BLACK_QUEENSIDE, chess.BB_A8)):
+            if self.castling & right:
+                board.castling_rights |= rook
+        board.ep_square = self.ep_square
+        board.halfmove_clock = self.halfmove_clock
+        board.fullmove_number = self.fullmove_number
+        return board
+
+    def fen(self) -> str:
+        return self.to_board().fen()
+
+    def compute_key(self) -> int:
+        key = CASTLING_KEYS[self.castling]
+        for square, code in enumerate(self.mailbox):
+            if code:
+                key ^= PIECE_KEYS[code >> 3][code & 7][square]
+        if self.ep_square is not None:
+            key ^= EP_KEYS[self.ep_square]
+        if self.turn:
+            key ^= TURN_KEY
+        return key
+
+    def compute_eval(self):
+        """(mg_score, eg_score, phase) summed over the whole board"""
+        if self.eval_tables is None:
+            return 0, 0, 0
+        mg_table, eg_table = self.eval_tables
+
+        mg_score = eg_score = phase = 0
+        for square, code in enumerate(self.mailbox):
+            if code:
+                mg_score += mg_table[(code << 6) | square]
+                eg_score += eg_table[(code << 6) | square]
+                phase += PHASE_WEIGHTS[code & 7]
+        return mg_score, eg_score, phase
+
+    def can_capture_en_passant(self, ep_square: int) -> bool:
+        """Whether a pawn of the side to move stands next to the pawn that just double pushed"""
+        return bool(PAWN_ATTACKS[not self.turn][ep_square] & self.bb[(self.turn << 3) | chess.PAWN])
+
+    # -- attacks -------------------------------------------------------------
+
+    def pieces_mask(self, piece_type: int, color: bool) -> int:
+        return self.bb[(color << 3) | piece_type]
+
+    def piece_type_at(self, square: int) -> int:
+        return self.mailbox[square] & 7
+
+    def attackers_mask(self, color: bool, square: int, occupied: int) -> int:
+        bb, c = self.bb, color << 3
+        queens = bb[c | chess.QUEEN]
+        rooks_and_queens = bb[c | chess.ROOK] | queens
+        bishops_and_queens = bb[c | chess.BISHOP] | queens
+
+        return ((KING_ATTACKS[square] & bb[c | chess.KING])
+                | (KNIGHT_ATTACKS[square] & bb[c | chess.KNIGHT])
+                | (RANK_ATTACKS[square][RANK_MASKS[square] & occupied] & rooks_and_queens)
+                | (FILE_ATTACKS[square][FILE_MASKS[square] & occupied] & rooks_and_queens)
+                | (DIAG_ATTACKS[square][DIAG_MASKS[square] & occupied] & bishops_and_queens)
+                | (PAWN_ATTACKS[not color][square] & bb[c | chess.PAWN]))
+
+    def attacks_from(self, piece_type: int, square: int) -> int:
+        """Squares a knight, bishop, rook, queen or king on square attacks"""
+        occupied = self.occupied
+        if piece_type == chess.KNIGHT:
+            return KNIGHT_ATTACKS[square]
+        if piece_type == chess.KING:
+            return KING_ATTACKS[square]
+
+        attacks = 0
+        if piece_type != chess.ROOK:
+            attacks = DIAG_ATTACKS[square][DIAG_MASKS[square] & occupied]
+        if piece_type != chess.BISHOP:
+            attacks |= (RANK_ATTACKS[square][RANK_MASKS[square] & occupied]
+                        | FILE_ATTACKS[square][FILE_MASKS[square] & occupied])
+        return attacks
+
+    def king(self, color: bool) -> int:
+        return self.bb[(color << 3) | chess.KING].bit_length() - 1
+
+    def checkers_mask(self) -> int:
+        return self.attackers_mask(not self.turn, self.king(self.turn), self.occupied)
+
+    def is_check(self) -> bool:
+        return bool(self.checkers_mask())
+
+    def pinned_mask(self, king: int) -> int:
+        """Pieces of the side to move that stand alone between their king and an enemy slider"""
+        bb, them = self.bb, (not self.turn) << 3
+        queens = bb[them | chess.QUEEN]
+        rooks_and_queens = bb[them | chess.ROOK] | queens
+        bishops_and_queens = bb[them | chess.BISHOP] | queens
+
+        snipers = (((RANK_ATTACKS[king][0] | FILE_ATTACKS[king][0]) & rooks_and_queens)
+                   | (DIAG_ATTACKS[king][0] & bishops_and_queens))
+
+        pinned, occupied = 0, self.occupied
+        while snipers:
+            sniper = (snipers & -snipers).bit_length() - 1
+            snipers &= snipers - 1
+            blockers = BETWEEN[king][sniper] & occupied
+            if blockers and not blockers & (blockers - 1):
+                pinned |= blockers
+        return pinned & self.occupied_co[self.turn]
+
+    def has_non_pawn_material(self) -> bool:
+        bb, c = self.bb, self.turn << 3
+        return bool(bb[c | chess.KNIGHT] | bb[c | chess.BISHOP] | bb[c | chess.ROOK] | bb[c | chess.QUEEN])
+
+    # -- move generation -----------------------------------------------------
+
+    def generate_pseudo_captures(self) -> list:
+        """Captures, capture promotions and en passant, without checking king safety"""
+        moves = []
+        append = moves.append
+        us, bb = self.turn, self.bb
+        c = us << 3
+        enemy = self.occupied_co[not us]
+
+        pawns = bb[c | chess.PAWN]
+        promotion_rank = PROMOTION_RANKS[us]
+        pawn_attacks = PAWN_ATTACKS[us]
+        while pawns:
+            source = (pawns & -pawns).bit_length() - 1
+            pawns &= pawns - 1
+            targets = pawn_attacks[source] & enemy
+            while targets:
+                target = (targets & -targets).bit_length() - 1
+                targets &= targets - 1
+                if BB_SQUARES[target] & promotion_rank:
+                    for promotion in PROMOTIONS:
+                        append(source | (target << 6) | (promotion << 12))
+                else:
+                    append(source | (target << 6))
+
+        ep_square = self.ep_square
+        if ep_square is not None:
+            capturers = PAWN_ATTACKS[not us][ep_square] & bb[c | chess.PAWN]
+            while capturers:
+                source = (capturers & -capturers).bit_length() - 1
+                capturers &= capturers - 1
+                append(source | (ep_square << 6))
+
+        self._piece_moves(append, enemy)
+        return moves
+
+    def generate_pseudo_quiets(self) -> list:
+        """Moves to empty squares: pushes, quiet promotions, piece moves and castling"""
+        moves = []
+        append = moves.append
+        us, bb = self.turn, self.bb
+        c = us << 3
+        empty = ~self.occupied & chess.BB_ALL
+
+        pawns = bb[c | chess.PAWN]
+        if us:
+            single = (pawns << 8) & empty
+            double = ((single & DOUBLE_PUSH_RANKS[us]) << 8) & empty
+            step = 8
+        else:
+            single = (pawns >> 8) & empty
+            double = ((single & DOUBLE_PUSH_RANKS[us]) >> 8) & empty
+            step = -8
+
+        promotion_rank = PROMOTION_RANKS[us]
+        while single:
+            target = (single & -single).bit_length() - 1
+            single &= single - 1
+            if BB_SQUARES[target] & promotion_rank:
+                for promotion in PROMOTIONS:
+                    append((target - step) | (target << 6) | (promotion << 12))
+            else:
+                append((target - step) | (target << 6))
+        while double:
+            target = (double & -double).bit_length() - 1
+            double &= double - 1
+            append((target - 2 * step) | (target << 6))
+
+        self._piece_moves(append, empty)
+
+        castling = self.castling
+        if castling:
+            for right, king_from, king_to, empty_squares, king_path in CASTLING_MOVES:
+                if castling & right and (right & (3 if us else 12)) and self._can_castle(empty_squares, king_path):
+                    append(king_from | (king_to << 6))
+        return moves
+
+    def generate_pseudo_promotions(self) -> list:
+        """Quiet promotions only (pushes onto the last rank), for quiescence next to the captures"""
+        moves = []
+        us = self.turn
+        empty = ~self.occupied & chess.BB_ALL
+        pawns = self.bb[(us << 3) | chess.PAWN]
+
+        if us:
+            targets, step = ((pawns << 8) & empty) & PROMOTION_RANKS[us], 8
+        else:
+            targets, step = ((pawns >> 8) & empty) & PROMOTION_RANKS[us], -8
+
+        while targets:
+            target = (targets & -targets).bit_length() - 1
+            targets &= targets - 1
+            for promotion in PROMOTIONS:
+                moves.append((target - step) | (target << 6) | (promotion << 12))
+        return moves
+
+    def _piece_moves(self, append, target_mask: int):
+        """Knight, bishop, rook, queen and king moves (no castling) landing on target_mask"""
+        bb, c, occupied = self.bb, self.turn << 3, self.occupied
+
+        for piece_type in (chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN, chess.KING):
+            pieces = bb[c | piece_type]
+            while pieces:
+                source = (pieces & -pieces).bit_length() - 1
+                pieces &= pieces - 1
+
+                if piece_type == chess.KNIGHT:
+                    targets = KNIGHT_ATTACKS[source]
+                elif piece_type == chess.KING:
+                    targets = KING_ATTACKS[source]
+                else:
+                    targets = 0
+                    if piece_type != chess.ROOK:
+                        targets = DIAG_ATTACKS[source][DIAG_MASKS[source] & occupied]
+                    if piece_type != chess.BISHOP:
+                        targets |= (RANK_ATTACKS[source][RANK_MASKS[source] & occupied]
+                                    | FILE_ATTACKS[source][FILE_MASKS[source] & occupied])
+
+                targets &= target_mask
+                while targets:
+                    target = (targets & -targets).bit_length() - 1
+                    targets &= targets - 1
+                    append(source | (target << 6))
+
+    def _can_castle(self, empty_squares: int, king_path) -> bool:
+        if self.occupied & empty_squares:
+            return False
+        them, occupied = not self.turn, self.occupied
+        for square in king_path:
+            if self.attackers_mask(them, square, occupied):
+                return False
+        return True
+
+    def generate_captures(self) -> list:
+        return self._legal(self.generate_pseudo_captures())
+
+    def generate_promotions(self) -> list:
+        return self._legal(self.generate_pseudo_promotions())
+
+    def generate_quiets(self) -> list:
+        return self._legal(self.generate_pseudo_quiets())
+
+    def generate_moves(self) -> list:
+        return self._legal(self.generate_pseudo_captures() + self.generate_pseudo_quiets())
+
+    def _legal(self, moves: list) -> list:
+        king = self.king(self.turn)
+        checkers = self.attackers_mask(not self.turn, king, self.occupied)
+        pinned = self.pinned_mask(king)
+        is_safe = self._is_safe
+        return [move for move in moves if is_safe(move, king, checkers, pinned)]
+
+    def _is_safe(self, move: int, king: int, checkers: int, pinned: int) -> bool:
+        """Legality of a pseudo-legal move, given the king square, checkers and pinned pieces"""
+        source, target = move & 63, (move >> 6) & 63
+
+        if source == king:
+            if abs(source - target) == 2:
+                # castling out of or through check was ruled out when generating it
+                return True
+            return not self.attackers_mask(not self.turn, target, self.occupied ^ BB_SQUARES[source])
+
+        if target == self.ep_square and self.mailbox[source] & 7 == chess.PAWN:
+            # en passant removes two pieces from a line, just try it
+            self.push(move)
+            safe = not self.attackers_mask(self.turn, self.king(not self.turn), self.occupied)
+            self.pop()
+            return safe
+
+        if checkers:
+            if checkers & (checkers - 1):
+                return False
+            checker = checkers.bit_length() - 1
+            if not (BETWEEN[king][checker] | checkers) & BB_SQUARES[target]:
+                return False
+
+        if pinned & BB_SQUARES[source]:
+            return bool(RAYS[king][source] & BB_SQUARES[target])
+        return True
+
+    def is_pseudo_legal(self, move: int) -> bool:
+        """Whether move (e.g. from the TT or a killer slot) can be played here, ignoring king safety"""
+        if not move:
+            return False
+
+        us, mailbox = self.turn, self.mailbox
+        source, target, promotion = move & 63, (move >> 6) & 63, move >> 12
+        piece = mailbox[source]
+        if not piece or (piece >> 3) != us:
+            return False
+        captured = mailbox[target]
+        if captured and (captured >> 3) == us:
+            return False
+
+        piece_type = piece & 7
+        if piece_type == chess.PAWN:
+            if bool(promotion) != bool(BB_SQUARES[target] & PROMOTION_RANKS[us]):
+                return False
+            if BB_SQUARES[target] & PAWN_ATTACKS[us][source]:
+                return bool(captured) or target == self.ep_square
+            step = 8 if us else -8
+            if target == source + step:
+                return not captured
+            return (target == source + 2 * step and not captured and not mailbox[source + step]
+                    and bool(BB_SQUARES[source + step] & DOUBLE_PUSH_RANKS[us]))
+
+        if promotion:
+            return False
+        if piece_type == chess.KING and abs(source - target) == 2:
+            castle = CASTLING_BY_TARGET.get(target)
+            if castle is None or castle[1] != source or not self.castling & castle[0]:
+                return False
+            return self._can_castle(castle[3], castle[4])
+        return bool(BB_SQUARES[target] & self.attacks_from(piece_type, source))
+
+    def is_legal(self, move: int) -> bool:
+        if not self.is_pseudo_legal(move):
+            return False
+        king = self.king(self.turn)
+        checkers = self.attackers_mask(not self.turn, king, self.occupied)
+        return self._is_safe(move, king, checkers, self.pinned_mask(king))
+
+    def was_legal(self) -> bool:
+        """After push() of a pseudo-legal move: whether the side that moved kept its king out of check"""
+        return not self.attackers_mask(self.turn, self.king(not self.turn), self.occupied)
+
+    def is_capture(self, move: int) -> bool:
+        target = (move >> 6) & 63
+        if self.mailbox[target]:
+            return True
+        return target == self.ep_square and self.mailbox[move & 63] & 7 == chess.PAWN
+
+    def gives_check(self, move: int) -> bool:
+        self.push(move)
+        check = self.is_check()
+        self.pop()
+        return check
+
+    # -- make / unmake -------------------------------------------------------
+
+    def push(self, move: int) -> None:
+        us = self.turn
+        them = not us
+        bb, mailbox, occupied_co = self.bb, self.mailbox, self.occupied_co
+
+        key = self.key
+        ep_square, castling, halfmove_clock = self.ep_square, self.castling, self.halfmove_clock
+        mg_score, eg_score, phase = self.mg_score, self.eg_score, self.phase
+
+        captured = 0
+        new_ep_square = None
+        new_castling, new_halfmove_clock = castling, halfmove_clock + 1
+
+        if move:
+            source, target, promotion = move & 63, (move >> 6) & 63, move >> 12
+            source_bb, target_bb = BB_SQUARES[source], BB_SQUARES[target]
+            eval_tables = self.eval_tables
+
+            piece = mailbox[source]
+            new_piece = ((us << 3) | promotion) if promotion else piece
+            piece_type = piece & 7
+            captured = mailbox[target]
+
+            cap_sq = target
+            if captured:
+                bb[captured] ^= target_bb
+                occupied_co[them] ^= target_bb
+            elif piece_type == chess.PAWN and target == ep_square:
+                cap_sq = target - 8 if us else target + 8
+                captured = mailbox[cap_sq]
+                mailbox[cap_sq] = 0
+                bb[captured] ^= BB_SQUARES[cap_sq]
+                occupied_co[them] ^= BB_SQUARES[cap_sq]
+
+            bb[piece] ^= source_bb
+            bb[new_piece] ^= target_bb
+            occupied_co[us] ^= source_bb | target_bb
+            mailbox[source], mailbox[target] = 0, new_piece
+
+            own_keys = PIECE_KEYS[us]
+            key ^= own_keys[piece_type][source] ^ own_keys[new_piece & 7][target]
+
+            if eval_tables is not None:
+                mg_table, eg_table = eval_tables
+                from_index, to_index = (piece << 6) | source, (new_piece << 6) | target
+                mg_score += mg_table[to_index] - mg_table[from_index]
+                eg_score += eg_table[to_index] - eg_table[from_index]
+                if promotion:
+                    phase += PHASE_WEIGHTS[promotion]
+
+            if captured:
+                key ^= PIECE_KEYS[them][captured & 7][cap_sq]
+                if eval_tables is not None:
+                    captured_index = (captured << 6) | cap_sq
+                    mg_score -= mg_table[captured_index]
+                    eg_score -= eg_table[captured_index]
+                    phase -= PHASE_WEIGHTS[captured & 7]
+                new_halfmove_clock = 0
+            elif piece_type == chess.KING and abs(source - target) == 2:
+                rook_from, rook_to = CASTLING_ROOKS[target]
+                rook = (us << 3) | chess.ROOK
+                rook_bb = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+                bb[rook] ^= rook_bb
+                occupied_co[us] ^= rook_bb
+                mailbox[rook_from], mailbox[rook_to] = 0, rook
+                key ^= own_keys[chess.ROOK][rook_from] ^ own_keys[chess.ROOK][rook_to]
+                if eval_tables is not None:
+                    mg_score += mg_table[(rook << 6) | rook_to] - mg_table[(rook << 6) | rook_from]
+                    eg_score += eg_table[(rook << 6) | rook_to] - eg_table[(rook << 6) | rook_from]
+
+            if piece_type == chess.PAWN:
+                new_halfmove_clock = 0
+                if abs(source - target) == 16:
+                    new_ep_square = (source + target) >> 1
+
+            new_castling = castling & CASTLING_KEEP[source] & CASTLING_KEEP[target]
+            if new_castling != castling:
+                key ^= CASTLING_KEYS[castling] ^ CASTLING_KEYS[new_castling]
+
+            self.occupied = occupied_co[0] | occupied_co[1]
+
+        # compact undo record: everything pop can't work out from the move itself
+        self._undo.append((move, captured, castling, ep_square, halfmove_clock, self.key, self.mg_score, self.eg_score, self.phase))
+        self.move_stack.append(move)
+        self.castling, self.halfmove_clock = new_castling, new_halfmove_clock
+        self.mg_score, self.eg_score, self.phase = mg_score, eg_score, phase
+
+        if ep_square is not None:
+            key ^= EP_KEYS[ep_square]
+        self.turn = them
+        if new_ep_square is not None and self.can_capture_en_passant(new_ep_square):
+            key ^= EP_KEYS[new_ep_square]
+        else:
+            new_ep_square = None
+        self.ep_square = new_ep_square
+
+        if not us:
+            self.fullmove_number += 1
+        self.key = key ^ TURN_KEY
+
+        if self.debug:
+            board = self.to_board()
+            assert self.key == chess.polyglot.zobrist_hash(board), f"zobrist key out of sync after {move_to_chess(move)} in {board.fen()}"
+            assert (self.mg_score, self.eg_score, self.phase) == self.compute_eval(), f"eval sums out of sync after {move_to_chess(move)} in {board.fen()}"
+            assert self.occupied == board.occupied, f"bitboards out of sync after {move_to_chess(move)} in {board.fen()}"
+
+    def pop(self) -> int:
+        move, captured, castling, ep_square, halfmove_clock, key, mg_score, eg_score, phase = self._undo.pop()
+        self.move_stack.pop()
+
+        us = self.turn = not self.turn
+        self.castling, self.ep_square, self.halfmove_clock = castling, ep_square, halfmove_clock
+        self.key, self.mg_score, self.eg_score, self.phase = key, mg_score, eg_score, phase
+        if not us:
+            self.fullmove_number -= 1
+
+        if not move:
+            return move
+
+        bb, mailbox, occupied_co = self.bb, self.mailbox, self.occupied_co
+        source, target = move & 63, (move >> 6) & 63
+        source_bb, target_bb = BB_SQUARES[source], BB_SQUARES[target]
+
+        new_piece = mailbox[target]
+        piece = ((us << 3) | chess.PAWN) if move >> 12 else new_piece
+        bb[new_piece] ^= target_bb
+        bb[piece] ^= source_bb
+        occupied_co[us] ^= source_bb | target_bb
+        mailbox[source], mailbox[target] = piece, 0
+
+        if captured:
+            cap_sq = target
+            if piece & 7 == chess.PAWN and target == ep_square:
+                cap_sq = target - 8 if us else target + 8
+            bb[captured] ^= BB_SQUARES[cap_sq]
+            occupied_co[not us] ^= BB_SQUARES[cap_sq]
+            mailbox[cap_sq] = captured
+        elif piece & 7 == chess.KING and abs(source - target) == 2:
+            rook_from, rook_to = CASTLING_ROOKS[target]
+            rook = (us << 3) | chess.ROOK
+            rook_bb = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+            bb[rook] ^= rook_bb
+            occupied_co[us] ^= rook_bb
+            mailbox[rook_from], mailbox[rook_to] = rook, 0
+
+        self.occupied = occupied_co[0] | occupied_co[1]
+        return move
+
+    def perft(self, depth: int) -> int:
+        if depth == 0:
+            return 1
+
+        moves = self.generate_moves()
+        if depth == 1:
+            return len(moves)
+
+        nodes = 0
+        for move in moves:
+            self.push(move)
+            nodes += self.perft(depth - 1)
+            self.pop()
+        return nodes
@@ -0,0 +1,250 @@
+import chess
+import chess.polyglot
+from support.PieceSquareTables import pst_index
+
+POLYGLOT = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+
+# PIECE_KEYS[color][piece_type][square], same values chess.polyglot hashes with
+PIECE_KEYS = [
+    [None] + [[POLYGLOT[64 * ((piece_type - 1) * 2 + color) + square] for square in range(64)] for piece_type in range(1, 7)]
+    for color in (chess.BLACK, chess.WHITE)
+]
+CASTLING_KEYS = (
+    (chess.BB_H1, POLYGLOT[768]),
+    (chess.BB_A1, POLYGLOT[769]),
+    (chess.BB_H8, POLYGLOT[770]),
+    (chess.BB_A8, POLYGLOT[771]),
+)
+EP_KEYS = [POLYGLOT[772 + chess.square_file(square)] for square in range(64)]
+TURN_KEY = POLYGLOT[780]
+
+# Rook move for each castling king destination
+CASTLING_ROOKS = {
+    chess.G1: (chess.H1, chess.F1),
+    chess.C1: (chess.A1, chess.D1),
+    chess.G8: (chess.H8, chess.F8),
+    chess.C8: (chess.A8, chess.D8),
+}
+
+# Game phase in integer units: 24 with all minor and major pieces on the board, 0 with none.
+# PHASE_TAPER[phase] is the midgame weight out of 256 for blending with a shift.
+PHASE_WEIGHTS = (0, 0, 1, 1, 2, 4, 0)
+MAX_PHASE = 24
+PHASE_TAPER = [(phase * 256 + MAX_PHASE // 2) // MAX_PHASE for phase in range(MAX_PHASE + 1)]
+
+
+def castling_key(castling_rights: int) -> int:
+    key = 0
+    for mask, value in CASTLING_KEYS:
+        if castling_rights & mask:
+            key ^= value
+    return key
+
+
+class SearchBoard(chess.Board):
+    """
+    chess.Board that keeps its polyglot zobrist key up to date on every push
+    and pop, so the search can read self.key instead of rehashing the whole
+    position at every node.
+
+    Given eval_tables, the (mg, eg) flat tables from build_piece_square_tables,
+    it also keeps running tapered eval sums, white positive: mg_score /
+    eg_score (material + midgame / endgame tables) and phase (PHASE_WEIGHTS
+    summed over the board, MAX_PHASE at the start).
+
+    self.mailbox[square] holds color << 3 | piece_type of the piece there (0 if
+    empty), so the search can look pieces up without walking the bitboards or
+    allocating a chess.Piece. mailbox[square] & 7 is the piece type, and
+    mailbox[square] << 6 | square indexes the build_piece_square_tables tables.
+
+    The key, sums and mailbox only follow push/pop. After editing the board any
+    other way (set_fen, set_piece_at, ...) call reset_key(), reset_eval() and
+    reset_mailbox(). With debug=True every push checks them against a full
+    recomputation.
+    """
+
+    def __init__(self, fen=chess.STARTING_FEN, *, chess960=False, debug=False, eval_tables=None):
+        super().__init__(fen, chess960=chess960)
+        self.debug = debug
+        self.eval_tables = eval_tables
+        self.reset_key()
+        self.reset_mailbox()
+        self.reset_eval()
+
+    @classmethod
+    def from_board(cls, board: chess.Board, debug=False, eval_tables=None) -> "SearchBoard":
+        search_board = cls(board.fen(), chess960=board.chess960, debug=debug, eval_tables=eval_tables)
+        search_board.move_stack = board.move_stack.copy()
+        search_board._stack = board._stack.copy()
+        return search_board
+
+    def reset_key(self):
+        self.key = chess.polyglot.zobrist_hash(self)
+        self._key_stack = []
+
+    def reset_mailbox(self):
+        self.mailbox = self.compute_mailbox()
+        self._mailbox_stack = []
+
+    def compute_mailbox(self) -> list:
+        mailbox = [0] * 64
+        for square, piece in self.piece_map().items():
+            mailbox[square] = (piece.color << 3) | piece.piece_type
+        return mailbox
+
+    def reset_eval(self):
+        self.mg_score, self.eg_score, self.phase = self.compute_eval()
+        self._eval_stack = []
+
+    def compute_eval(self):
+        """(mg_score, eg_score, phase) summed over the whole board"""
+        if self.eval_tables is None:
+            return 0, 0, 0
+        mg_table, eg_table = self.eval_tables
+
+        mg_score = eg_score = phase = 0
+        for piece_type in range(chess.PAWN, chess.KING + 1):
+            for color in chess.COLORS:
+                for square in self.pieces(piece_type, color):
+                    mg_score += mg_table[pst_index(color, piece_type, square)]
+                    eg_score += eg_table[pst_index(color, piece_type, square)]
+
+            phase += PHASE_WEIGHTS[piece_type] * chess.popcount(self.pieces_mask(piece_type, chess.WHITE) | self.pieces_mask(piece_type, chess.BLACK))
+
+        return mg_score, eg_score, phase
+
+    def ep_key(self) -> int:
+        ep_square = self.ep_square
+        if ep_square is None:
+            return 0
+
+        # polyglot only hashes the file when a pawn is ready to capture
+        if self.turn == chess.WHITE:
+            ep_mask = chess.shift_down(chess.BB_SQUARES[ep_square])
+        else:
+            ep_mask = chess.shift_up(chess.BB_SQUARES[ep_square])
+        ep_mask = chess.shift_left(ep_mask) | chess.shift_right(ep_mask)
+
+        if ep_mask & self.pawns & self.occupied_co[self.turn]:
+            return EP_KEYS[ep_square]
+        return 0
+
+    def push(self, move: chess.Move) -> None:
+        key = self.key
+        self._key_stack.append(key)
+
+        if self.ep_square is not None:
+            key ^= self.ep_key()
+        castling_rights = self.castling_rights
+
+        eval_tables = self.eval_tables
+        if eval_tables is not None:
+            mg_score, eg_score, phase = self.mg_score, self.eg_score, self.phase
+            self._eval_stack.append((mg_score, eg_score, phase))
+
+        if move:
+            turn = self.turn
+            source, target = move.from_square, move.to_square
+            own_keys = PIECE_KEYS[turn]
+            mailbox = self.mailbox
+
+            piece = mailbox[source]
+            captured = mailbox[target]
+            self._mailbox_stack.append(captured)
+            piece_type = piece & 7
+            new_piece = (piece & 8) | move.promotion if move.promotion else piece
+            new_type = new_piece & 7
+
+            key ^= own_keys[piece_type][source] ^ own_keys[new_type][target]
+            mailbox[source], mailbox[target] = 0, new_piece
+
+            rook_from = cap_sq = None
+            if captured:
+                cap_sq = target
+                key ^= PIECE_KEYS[not turn][captured & 7][target]
+            elif piece_type == chess.PAWN and target == self.ep_square:
+                cap_sq = target - 8 if turn else target + 8
+                captured, mailbox[cap_sq] = mailbox[cap_sq], 0
+                key ^= PIECE_KEYS[not turn][chess.PAWN][cap_sq]
+            elif piece_type == chess.KING and abs(source - target) == 2:
+                rook_from, rook_to = CASTLING_ROOKS[target]
+                mailbox[rook_to], mailbox[rook_from] = mailbox[rook_from], 0
+                key ^= own_keys[chess.ROOK][rook_from] ^ own_keys[chess.ROOK][rook_to]
+
+            if eval_tables is not None:
+                # signed per-colour tables: entries are already mirrored and negated for black
+                mg_table, eg_table = eval_tables
+                from_index, to_index = (piece << 6) | source, (new_piece << 6) | target
+
+                mg_score += mg_table[to_index] - mg_table[from_index]
+                eg_score += eg_table[to_index] - eg_table[from_index]
+                if new_piece != piece:
+                    phase += PHASE_WEIGHTS[new_type]
+
+                if captured:
+                    captured_index = (captured << 6) | cap_sq
+                    mg_score -= mg_table[captured_index]
+                    eg_score -= eg_table[captured_index]
+                    phase -= PHASE_WEIGHTS[captured & 7]
+                elif rook_from is not None:
+                    rook = (turn << 9) | (chess.ROOK << 6)
+                    mg_score += mg_table[rook | rook_to] - mg_table[rook | rook_from]
+                    eg_score += eg_table[rook | rook_to] - eg_table[rook | rook_from]
+
+                self.mg_score, self.eg_score, self.phase = mg_score, eg_score, phase
+
+        super().push(move)
+
+        if castling_rights != self.castling_rights:
+            key ^= castling_key(castling_rights) ^ castling_key(self.castling_rights)
+
+        if self.ep_square is not None:
+            key ^= self.ep_key()
+        self.key = key ^ TURN_KEY
+
+        if self.debug:
+            assert self.key == chess.polyglot.zobrist_hash(self), f"zobrist key out of sync after {move} in {self.fen()}"
+            assert (self.mg_score, self.eg_score, self.phase) == self.compute_eval(), f"eval sums out of sync after {move} in {self.fen()}"
+            assert self.mailbox == self.compute_mailbox(), f"mailbox out of sync after {move} in {self.fen()}"
+
+    def pop(self) -> chess.Move:
+        move = super().pop()
+
+        if self._key_stack:
+            self.key = self._key_stack.pop()
+        else:
+            # popped below the position the key was started from
+            self.key = chess.polyglot.zobrist_hash(self)
+
+        if self._eval_stack:
+            self.mg_score, self.eg_score, self.phase = self._eval_stack.pop()
+        else:
+            self.mg_score, self.eg_score, self.phase = self.compute_eval()
+
+        if not move:
+            return move
+        if not self._mailbox_stack:
+            self.mailbox = self.compute_mailbox()
+            return move
+
+        # undo the push with the board back in its earlier state
+        source, target = move.from_square, move.to_square
+        mailbox = self.mailbox
+        captured = self._mailbox_stack.pop()
+
+        piece = mailbox[target]
+        if move.promotion:
+            piece = (piece & 8) | chess.PAWN
+        piece_type = piece & 7
+
+        mailbox[source] = piece
+        if piece_type == chess.PAWN and target == self.ep_square:
+            mailbox[target] = 0
+            mailbox[target - 8 if self.turn else target + 8] = ((not self.turn) << 3) | chess.PAWN
+        else:
+            mailbox[target] = captured
+            if piece_type == chess.KING and abs(source - target) == 2:
+                rook_from, rook_to = CASTLING_ROOKS[target]
+                mailbox[rook_from], mailbox[rook_to] = mailbox[rook_to], 0
+
+        return move
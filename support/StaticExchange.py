@@ -0,0 +1,72 @@
+import chess
+
+# Same material values the bots use in pieceWt, indexed by piece type
+SEE_VALUES = (0, 100, 300, 300, 500, 900, 20000)
+
+
+def see(board: chess.Board, move: chess.Move, values=SEE_VALUES) -> int:
+    """
+    Static Exchange Evaluation: material the side to move wins (or loses, if
+    negative) by playing *move* and then trading off on its target square,
+    cheapest attacker first, where each side may stop capturing at any time.
+
+    Sliders hidden behind pieces that already captured join in (x-rays).
+    """
+    return static_exchange(board, move.from_square, move.to_square, move.promotion, values)
+
+
+def static_exchange(board, source: int, target: int, promotion=None, values=SEE_VALUES) -> int:
+    """
+    see() for a move given by its squares, so boards with their own move
+    format (support.Position) can use it. board only needs piece_type_at,
+    attackers_mask, pieces_mask, occupied, ep_square and turn.
+    """
+    piece_type_at, attackers_mask, pieces_mask = board.piece_type_at, board.attackers_mask, board.pieces_mask
+
+    # a SearchBoard's or Position's mailbox saves walking the bitboards for the first two pieces
+    mailbox = getattr(board, "mailbox", None)
+    if mailbox is not None:
+        attacker, victim = mailbox[source] & 7, mailbox[target] & 7
+    else:
+        attacker, victim = piece_type_at(source), piece_type_at(target)
+    occupied = board.occupied ^ chess.BB_SQUARES[source]
+
+    if not victim and attacker == chess.PAWN and target == board.ep_square:
+        victim = chess.PAWN
+        occupied ^= chess.BB_SQUARES[target - 8 if board.turn else target + 8]
+
+    gain = [values[victim or 0]]
+    if promotion:
+        gain[0] += values[promotion] - values[chess.PAWN]
+        attacker = promotion
+
+    color = not board.turn
+    depth = 0
+
+    while True:
+        attackers = attackers_mask(color, target, occupied) & occupied
+        if not attackers:
+            break
+
+        # least valuable attacker
+        for piece_type in range(chess.PAWN, chess.KING + 1):
+            candidates = attackers & pieces_mask(piece_type, color)
+            if candidates:
+                break
+
+        depth += 1
+        gain.append(values[attacker] - gain[depth - 1])
+        if max(-gain[depth - 1], gain[depth]) < 0:
+            # the side to capture here already stood better by stopping, deeper captures can't change that
+            depth -= 1
+            break
+
+        occupied ^= candidates & -candidates
+        attacker = piece_type
+        color = not color
+
+    while depth:
+        gain[depth - 1] = -max(-gain[depth - 1], gain[depth])
+        depth -= 1
+
+    return gain[0]
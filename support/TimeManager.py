@@ -0,0 +1,57 @@
+import time
+
+
+class SearchTimeout(Exception):
+    """Raised from inside the search once the hard deadline has passed."""
+
+
+class TimeManager:
+    """
+    Soft / hard time limits for iterative deepening.
+
+    The soft limit decides whether another iteration is started, the hard
+    limit aborts an iteration in progress. The search calls check() every
+    check_every nodes (a power of two) so the clock is read rarely.
+    """
+
+    def __init__(self, check_every=1024, moves_to_go=30, soft_ratio=0.5, hard_ratio=3.0):
+        self.check_mask = check_every - 1
+        self.moves_to_go = moves_to_go
+        self.soft_ratio = soft_ratio
+        self.hard_ratio = hard_ratio
+
+        self.start_time = 0.0
+        self.soft_deadline = None
+        self.hard_deadline = None
+
+    def start(self, time_limit=None, clock=None, increment=0.0):
+        """
+        :param time_limit: fixed seconds for this move, used as the hard limit
+        :param clock: seconds left on our clock, used when time_limit is None
+        :param increment: seconds added to our clock after the move
+        """
+        self.start_time = now = time.perf_counter()
+
+        if time_limit is not None:
+            soft, hard = time_limit * self.soft_ratio, time_limit
+        elif clock is not None:
+            soft = clock / self.moves_to_go + increment * 0.75
+            # never spend more than half of what is left on one move
+            hard = min(soft * self.hard_ratio, clock * 0.5)
+            soft = min(soft, hard)
+        else:
+            self.soft_deadline = self.hard_deadline = None
+            return
+
+        self.soft_deadline = now + soft
+        self.hard_deadline = now + hard
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start_time
+
+    def soft_expired(self) -> bool:
+        return self.soft_deadline is not None and time.perf_counter() >= self.soft_deadline
+
+    def check(self):
+        if self.hard_deadline is not None and time.perf_counter() >= self.hard_deadline:
+            raise SearchTimeout()
@@ -1,19 +1,115 @@
+from array import array
+
+# Bound flags stored with every entry
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Packed record layout (one unsigned 64-bit int per slot):
+#   bits  0-31  score + SCORE_OFFSET
+#   bits 32-39  depth + DEPTH_OFFSET (quiescence stores depth 0 and below)
+#   bits 40-41  bound flag
+#   bits 42-47  search generation
+#   bits 48-63  move, stored as is (the search's 16-bit int moves, 0 = no move)
+SCORE_OFFSET = 1 << 31
+DEPTH_OFFSET = 64
+ENTRY_BYTES = 16  # 8 byte key + 8 byte record
+BUCKET_SIZE = 2   # slot 0 prefers depth, slot 1 is always replaced
+GENERATION_MASK = 63
+HASHFULL_SAMPLE = 1000
+
+
 class TranspositionTable:
-    def __init__(self, num_entries=1000000):
+    """
+    Fixed size transposition table backed by two flat arrays: the zobrist keys
+    and one packed 64-bit record per slot. Memory use is decided up front by
+    size_mb and never grows, no per-entry Python objects are kept alive.
+
+    Slots are grouped in buckets of two. The first slot keeps the deepest
+    result of the current search and the second is always overwritten, so
+    fresh shallow results are never thrown away. Entries written before the
+    last new_search() call count as stale and lose their slot to anything.
+    A key already in the bucket is always updated in its own slot.
+    """
+
+    def __init__(self, size_mb=64):
+        num_entries = BUCKET_SIZE
+        while num_entries * 2 * ENTRY_BYTES <= size_mb * 1024 * 1024:
+            num_entries *= 2
+
         self.size = num_entries
-        self.table = [None] * self.size
+        self.mask = num_entries // BUCKET_SIZE - 1
+        self.generation = 0
+        self.keys = array('Q', [0]) * num_entries
+        self.data = array('Q', [0]) * num_entries
+
+    def clear(self):
+        self.generation = 0
+        self.keys = array('Q', [0]) * self.size
+        self.data = array('Q', [0]) * self.size
+
+    def new_search(self):
+        """Call once per select_move so entries from earlier searches age out."""
+        self.generation = (self.generation + 1) & GENERATION_MASK
 
     def store(self, key, depth, score, flag, move):
-        index = key % self.size
+        # quiescence has no depth floor, anything deeper than the field holds shares its lowest value
+        depth = max(depth, -DEPTH_OFFSET)
+        index = (key & self.mask) << 1
+        generation = self.generation
+        keys = self.keys
+
+        if keys[index] == key or keys[index + 1] == key:
+            # Same position: update its own slot, probe would never reach a second copy.
+            # A deeper result from this search keeps its bound, only the move is refreshed.
+            if keys[index] != key:
+                index += 1
+            record = self.data[index]
+            if not move:
+                move = record >> 48
+            if (((record >> 42) & GENERATION_MASK) == generation
+                    and ((record >> 32) & 0xFF) > depth + DEPTH_OFFSET):
+                self.data[index] = (record & 0xFFFFFFFFFFFF) | (move << 48)
+                return
+        else:
+            record = self.data[index]
+            if (keys[index]
+                    and ((record >> 42) & GENERATION_MASK) == generation
+                    and ((record >> 32) & 0xFF) > depth + DEPTH_OFFSET):
+                index += 1
+
+        keys[index] = key
+        self.data[index] = (
+            (int(score) + SCORE_OFFSET)
+            | ((depth + DEPTH_OFFSET) << 32)
+            | (flag << 40)
+            | (generation << 42)
+            | (move << 48)
+        )
 
-        entry = self.table[index]
-        if entry is None or entry[1] <= depth:
-            self.table[index] = (key, depth, score, flag, move)
-    
     def probe(self, key):
-        index = key % self.size
-        entry = self.table[index]
+        index = (key & self.mask) << 1
+
+        if self.keys[index] != key:
+            index += 1
+            if self.keys[index] != key:
+                return None
+
+        # entry: depth, score, flag, move
+        record = self.data[index]
+        return (
+            ((record >> 32) & 0xFF) - DEPTH_OFFSET,
+            (record & 0xFFFFFFFF) - SCORE_OFFSET,
+            (record >> 40) & 3,
+            record >> 48,
+        )
+
+    def hashfull(self) -> int:
+        """Permille of sampled slots holding an entry from the current search."""
+        keys, data, generation = self.keys, self.data, self.generation
+        sample = min(HASHFULL_SAMPLE, self.size)
+
+        used = 0
+        for index in range(sample):
+            if keys[index] and ((data[index] >> 42) & GENERATION_MASK) == generation:
+                used += 1
 
-        if entry is not None and entry[0] == key:
-            return entry
-        return None
\ No newline at end of file
+        return used * 1000 // sample